@@ -4,6 +4,7 @@ from typing import Optional, List, Dict, Any
 # import processpiper # No longer needed for XML conversion here
 import os
 from .api import call_deepseek_api
+from .generation import generate_bpmn_xml, is_complete_bpmn_xml
 # from processpiper.text2diagram import render # No longer needed
 
 router = APIRouter()
@@ -24,65 +25,7 @@ class BPMNResponse(BaseModel):
     # Recommendations might need separate handling
     recommendations: Optional[str] = None 
 
-# --- New XML Generation Prompt ---
-XML_GENERATION_PROMPT_TEMPLATE = """\
-Ты — эксперт-консультант по бизнес-процессам, специализирующийся на моделировании с использованием стандарта BPMN 2.0. Твоя основная задача — анализировать текстовые описания бизнес-процессов{previous_context} и преобразовывать их в валидный XML-код BPMN 2.0.
-
-Не забывай ковычки! "
-
-Входные данные: 
-{input_data_description}
-
-Требования к выходным данным:
-1.  Сгенерированный XML должен строго соответствовать спецификации BPMN 2.0.
-2.  XML должен корректно отображаться в средствах просмотра bpmn.js.
-3.  Диаграмма должна быть логичной, понятной и, по возможности, аккуратно разложенной, следуя лучшим практикам моделирования BPMN.
-4.  Ты ДОЛЖЕН выводить ТОЛЬКО чистый XML-код. Никакого вводного текста, объяснений, извинений, комментариев или форматирования markdown (например, ```xml ... ```) не допускается. Только XML.
-
-Пример структуры и элементов валидного BPMN 2.0 XML для справки (обрати внимание на структуру, именование элементов и использование атрибутов):
-
-<?xml version="1.0" encoding="UTF-8"?>
-<definitions xmlns="http://www.omg.org/spec/BPMN/20100524/MODEL" xmlns:bpmndi="http://www.omg.org/spec/BPMN/20100524/DI" xmlns:omgdi="http://www.omg.org/spec/DD/20100524/DI" xmlns:omgdc="http://www.omg.org/spec/DD/20100524/DC" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" id="sid-38422fae-e03e-43a3-bef4-bd33b32041b2" targetNamespace="http://bpmn.io/bpmn" exporter="bpmn-js (https://demo.bpmn.io)" exporterVersion="18.3.1">
-  <collaboration id="Collaboration_{{random_id}}">
-    <participant id="Participant_1" processRef="Process_1" name="Пул 1"/>
-    <!-- Add more participants, lanes, groups, annotations, message flows as needed based on input -->
-  </collaboration>
-  <process id="Process_1" isExecutable="false">
-     <laneSet id="LaneSet_1">
-        <lane id="Lane_1" name="Дорожка 1">
-           <!-- Add flowNodeRefs -->
-        </lane>
-     </laneSet>
-    <startEvent id="StartEvent_1" name="Начало Процесса">
-      <outgoing>SequenceFlow_1</outgoing>
-    </startEvent>
-    <task id="Task_1" name="Задача 1">
-      <incoming>SequenceFlow_1</incoming>
-      <outgoing>SequenceFlow_2</outgoing>
-    </task>
-    <!-- Add more tasks, gateways, events, subprocesses, data objects etc. -->
-    <endEvent id="EndEvent_1" name="Конец Процесса">
-      <incoming>SequenceFlow_N</incoming> 
-    </endEvent>
-    <!-- Define sequence flows -->
-    <sequenceFlow id="SequenceFlow_1" sourceRef="StartEvent_1" targetRef="Task_1" />
-    <!-- ... other sequence flows ... -->
-    <sequenceFlow id="SequenceFlow_N" sourceRef="..." targetRef="EndEvent_1" />
-  </process>
-  <!-- Add more process definitions if needed for collaboration -->
-  <!-- Add BPMNDiagram section for layout -->
-  <bpmndi:BPMNDiagram id="BpmnDiagram_1">
-    <bpmndi:BPMNPlane id="BpmnPlane_1" bpmnElement="Collaboration_{{random_id}}">
-       <!-- Define BPMNShape and BPMNEdge for layout -->
-       <bpmndi:BPMNShape id="Participant_1_di" bpmnElement="Participant_1" isHorizontal="true"> <omgdc:Bounds x="150" y="50" width="600" height="250" /> </bpmndi:BPMNShape>
-       <bpmndi:BPMNShape id="Lane_1_di" bpmnElement="Lane_1" isHorizontal="true"> <omgdc:Bounds x="180" y="50" width="570" height="250" /> </bpmndi:BPMNShape>
-       <bpmndi:BPMNShape id="StartEvent_1_di" bpmnElement="StartEvent_1"> <omgdc:Bounds x="222" y="132" width="36" height="36" /> </bpmndi:BPMNShape>
-       <!-- ... other shapes and edges ... -->
-    </bpmndi:BPMNPlane>
-  </bpmndi:BPMNDiagram>
-</definitions>
-"""
-
+# --- XML generation prompt and helpers live in generation.py ---
 # --- Removed old PiperFlow templates ---
 
 def type_choose(input_text: str) -> str:
@@ -127,31 +70,6 @@ def validate_bpmn_request(prompt: str) -> bool:
 
 # --- Removed recs_generation (needs separate handling or integrated prompt) ---
 
-def format_xml_generation_prompt(user_prompt: str, request_type: str, previous_bpmn_xml: Optional[str] = None, recommendations: Optional[str] = None) -> str:
-    """Formats the prompt for XML generation based on request type."""
-    
-    previous_context = ""
-    input_data_description = f"Текстовое описание процесса: {user_prompt}"
-
-    if request_type == 'TYPE_2' or request_type == 'TYPE_3':
-        if previous_bpmn_xml:
-            previous_context = " на основе существующей BPMN диаграммы"
-            input_data_description = f"Существующая BPMN XML диаграмма:\n```xml\n{previous_bpmn_xml}\n```\n\nЗапрос пользователя на {('добавление' if request_type == 'TYPE_2' else 'редактирование')}: {user_prompt}"
-            if recommendations and request_type == 'TYPE_3':
-                 input_data_description += f"\n\nРекомендации к применению: {recommendations}"
-        else:
-             # Fallback to creating new if previous XML is missing for edit/add
-             print(f"Warning: Request type is {request_type} but previous_bpmn_xml is missing. Treating as TYPE_1.")
-             request_type = 'TYPE_1'
-             input_data_description = f"Текстовое описание процесса: {user_prompt}" # Reset description
-
-    # Simple placeholder replacement, might need more sophisticated templating
-    formatted_prompt = XML_GENERATION_PROMPT_TEMPLATE.format(
-        previous_context=previous_context,
-        input_data_description=input_data_description
-    )
-    return formatted_prompt
-
 # --- Removed create_bpmn_xml_from_piperflow ---
 
 @router.post("/process_bpmn", response_model=BPMNResponse)
@@ -169,29 +87,15 @@ async def process_bpmn(request: BPMNRequest):
         request_type = type_choose(request.user_prompt)
         print(f"Determined request type: {request_type}")
 
-        # Format the XML generation prompt based on type
-        final_prompt = format_xml_generation_prompt(
+        # Generate the BPMN XML (blocking DeepSeek call)
+        generated_xml = generate_bpmn_xml(
             user_prompt=request.user_prompt,
             request_type=request_type,
             previous_bpmn_xml=request.previous_bpmn_xml,
-            recommendations=request.recommendations # Pass recommendations if needed for TYPE_3
+            recommendations=request.recommendations
         )
 
-        # Call DeepSeek API to get the BPMN XML
-        print("Sending prompt to DeepSeek for XML generation...")
-        bpmn_xml_response = call_deepseek_api(final_prompt)
-        print("Received response from DeepSeek.")
-
-        # --- Basic XML Validation/Cleanup (Optional but recommended) ---
-        # The prompt asks for pure XML, but let's try to clean it up just in case
-        generated_xml = bpmn_xml_response.strip()
-        if generated_xml.startswith("```xml"):
-             generated_xml = generated_xml[6:]
-        if generated_xml.endswith("```"):
-             generated_xml = generated_xml[:-3]
-        generated_xml = generated_xml.strip()
-
-        if not generated_xml.startswith("<?xml") or not generated_xml.endswith("</definitions>"):
+        if not is_complete_bpmn_xml(generated_xml):
              print("Warning: Generated response doesn't look like complete XML.")
              # Decide how to handle - maybe return error or try to use anyway?
              # For now, let's return an error if it's clearly not XML
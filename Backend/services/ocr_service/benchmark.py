@@ -0,0 +1,212 @@
+"""
+OCR throughput benchmark on synthetic documents.
+
+Generates PDFs locally with PyMuPDF (text-layer pages, rasterized "scanned"
+pages at several DPIs and mixed pages with a scanned figure), runs them through
+OCRService.extract_text for every backend and concurrency setting and reports
+pages/sec, peak RSS and character accuracy against the generated text.
+extract_text batches OCR across pages, so it has no latency of its own per
+page; p50/p95 page latency comes from a second pass through iter_pdf_pages at
+the same concurrency, which renders and OCRs one page at a time and times each.
+Each setting runs in a fresh process so peak RSS is its own. The result cache
+is not used, so every run does the full work.
+
+Usage:
+    python benchmark.py --backends auto tesseract trocr --concurrency 1 2 4
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import fitz  # PyMuPDF for PDF handling
+
+from benchmark_trocr import WORDS, character_error_rate
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN, LINE_HEIGHT, FONT_SIZE = 72, 18, 12
+
+# (document bytes, [(page kind, ground truth text), ...])
+Document = Tuple[bytes, List[Tuple[str, str]]]
+
+
+def _random_lines(rng: random.Random, count: int) -> List[str]:
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 9))) for _ in range(count)]
+
+
+def _draw_lines(page: "fitz.Page", lines: List[str], top: float = MARGIN) -> None:
+    for i, line in enumerate(lines):
+        page.insert_text((MARGIN, top + i * LINE_HEIGHT), line, fontsize=FONT_SIZE, fontname="helv")
+
+
+def _rasterize(lines: List[str], dpi: int, height: float = PAGE_HEIGHT) -> "fitz.Pixmap":
+    """Render text lines to a grayscale image, as a scanner would."""
+    scratch = fitz.open()
+    page = scratch.new_page(width=PAGE_WIDTH, height=height)
+    _draw_lines(page, lines, top=MARGIN if height == PAGE_HEIGHT else LINE_HEIGHT * 1.5)
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    scratch.close()
+    return pix
+
+
+def add_text_page(doc: "fitz.Document", rng: random.Random, lines: int) -> str:
+    """Digital page: everything is in the text layer."""
+    text = _random_lines(rng, lines)
+    _draw_lines(doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT), text)
+    return "\n".join(text)
+
+
+def add_scanned_page(doc: "fitz.Document", rng: random.Random, lines: int, dpi: int) -> str:
+    """Scanned page: a single image, no text layer."""
+    text = _random_lines(rng, lines)
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_image(page.rect, pixmap=_rasterize(text, dpi))
+    return "\n".join(text)
+
+
+def add_mixed_page(doc: "fitz.Document", rng: random.Random, lines: int, dpi: int) -> str:
+    """Digital text in the top half and a scanned figure with text in the bottom half."""
+    text = _random_lines(rng, lines // 2)
+    figure = _random_lines(rng, max(1, lines - lines // 2))
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    _draw_lines(page, text)
+    figure_height = LINE_HEIGHT * (len(figure) + 2)
+    figure_rect = fitz.Rect(0, PAGE_HEIGHT / 2, PAGE_WIDTH, PAGE_HEIGHT / 2 + figure_height)
+    page.insert_image(figure_rect, pixmap=_rasterize(figure, dpi, height=figure_height))
+    return "\n".join(text + figure)
+
+
+def generate_documents(docs: int, pages: int, lines: int, dpis: List[int], seed: int = 0) -> List[Document]:
+    """Generate PDFs cycling through text, scanned (at every DPI) and mixed pages."""
+    rng = random.Random(seed)
+    kinds = ["text"] + [f"scanned@{dpi}" for dpi in dpis] + [f"mixed@{dpi}" for dpi in dpis]
+    documents = []
+    for d in range(docs):
+        doc = fitz.open()
+        truth = []
+        for p in range(pages):
+            kind = kinds[(d * pages + p) % len(kinds)]
+            if kind == "text":
+                truth.append((kind, add_text_page(doc, rng, lines)))
+            elif kind.startswith("scanned"):
+                truth.append((kind, add_scanned_page(doc, rng, lines, int(kind.split("@")[1]))))
+            else:
+                truth.append((kind, add_mixed_page(doc, rng, lines, int(kind.split("@")[1]))))
+        documents.append((doc.tobytes(), truth))
+        doc.close()
+    return documents
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+def _make_service(backend: str):
+    """Build an OCRService restricted to one backend ('auto' keeps the planner's choice)."""
+    from ocr import OCRService
+
+    trocr_backend = "onnx" if backend == "onnx" else "torch"
+    service = OCRService(use_transformers=backend != "tesseract", trocr_backend=trocr_backend)
+    if backend in ("trocr", "onnx"):
+        service.use_tesseract = False
+    if backend != "tesseract" and not service.use_transformers:
+        raise RuntimeError(f"TrOCR is not available for backend '{backend}'")
+    if backend in ("tesseract", "auto") and not service.use_tesseract:
+        raise RuntimeError(f"Tesseract is not available for backend '{backend}'")
+    return service
+
+
+def run_setting(backend: str, concurrency: int, documents: List[Document]) -> Dict[str, Any]:
+    """Run all documents through one backend/concurrency setting (in a child process)."""
+    service = _make_service(backend)
+    # Warmup so model initialization isn't counted
+    service.extract_text(file_bytes=documents[0][0], file_type="pdf")
+
+    def run(document: Document) -> Dict[str, Any]:
+        return service.extract_text(file_bytes=document[0], file_type="pdf")
+
+    def page_latencies_ms(document: Document) -> List[float]:
+        return [record["elapsed_ms"] for record in service.iter_pdf_pages(file_bytes=document[0])
+                if record["type"] == "page"]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outputs = list(executor.map(run, documents))
+    wall = time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        page_latencies = [latency for latencies in executor.map(page_latencies_ms, documents) for latency in latencies]
+
+    accuracy: Dict[str, List[float]] = {}
+    for result, (_, truth) in zip(outputs, documents):
+        page_results = result.get("page_results", [])
+        for (kind, expected), page in zip(truth, page_results):
+            cer = character_error_rate(_normalize(page["text"]), _normalize(expected))
+            accuracy.setdefault(kind.split("@")[0], []).append(max(0.0, 1.0 - cer))
+
+    pages = sum(len(truth) for _, truth in documents)
+    return {
+        "backend": backend,
+        "concurrency": concurrency,
+        "pages": pages,
+        "seconds": round(wall, 2),
+        "pages_per_sec": round(pages / wall, 2),
+        "p50_page_ms": round(_percentile(page_latencies, 50), 1),
+        "p95_page_ms": round(_percentile(page_latencies, 95), 1),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "accuracy": {kind: round(statistics.mean(values), 3) for kind, values in accuracy.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["auto", "tesseract", "trocr"],
+                        choices=["auto", "tesseract", "trocr", "onnx"], help="Backends to compare")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2], help="Documents processed in parallel")
+    parser.add_argument("--docs", type=int, default=4, help="Number of synthetic documents")
+    parser.add_argument("--pages", type=int, default=6, help="Pages per document")
+    parser.add_argument("--lines", type=int, default=20, help="Text lines per page")
+    parser.add_argument("--dpi", nargs="+", type=int, default=[100, 200], help="Scan resolutions")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    documents = generate_documents(args.docs, args.pages, args.lines, args.dpi)
+    print(f"Generated {len(documents)} documents, {args.docs * args.pages} pages")
+
+    results = []
+    # A fresh process per setting, so peak RSS and model state don't carry over
+    ctx = multiprocessing.get_context("spawn")
+    for backend in args.backends:
+        for concurrency in args.concurrency:
+            with ctx.Pool(1) as pool:
+                try:
+                    result = pool.apply(run_setting, (backend, concurrency, documents))
+                except Exception as e:
+                    print(f"{backend} x{concurrency}: skipped ({e})", file=sys.stderr)
+                    continue
+            results.append(result)
+            accuracy = " ".join(f"{kind}={value:.3f}" for kind, value in result["accuracy"].items())
+            print(f"{backend:<10} x{concurrency:<3} {result['pages_per_sec']:>7.2f} pages/s  "
+                  f"p50 {result['p50_page_ms']:>8.1f} ms  p95 {result['p95_page_ms']:>8.1f} ms  "
+                  f"rss {result['peak_rss_mb']:>7.1f} MB  acc {accuracy}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compare TrOCR line recognition on the PyTorch and ONNX Runtime backends.
+
+Renders synthetic text lines, runs them through each backend and reports
+lines/sec and character error rate against the rendered text.
+
+Usage:
+    python benchmark_trocr.py --lines 64 --batch-size 16 --repeat 3
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr import OCRService
+
+WORDS = [
+    "invoice", "payment", "approval", "manager", "request", "order", "customer",
+    "delivery", "contract", "review", "process", "account", "report", "budget",
+    "warehouse", "shipment", "department", "signature", "deadline", "document",
+]
+
+
+def make_lines(count: int, seed: int = 0) -> List[Tuple[Image.Image, str]]:
+    """Render random printed text lines with their ground truth."""
+    rng = random.Random(seed)
+    font = ImageFont.load_default(size=32)
+    lines = []
+    for _ in range(count):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 7)))
+        left, top, right, bottom = font.getbbox(text)
+        image = Image.new("RGB", (right + 24, bottom + 16), "white")
+        ImageDraw.Draw(image).text((12, 8), text, fill="black", font=font)
+        lines.append((image, text))
+    return lines
+
+
+def character_error_rate(predicted: str, expected: str) -> float:
+    """Levenshtein distance between the strings divided by the expected length."""
+    previous = list(range(len(expected) + 1))
+    for i, p in enumerate(predicted, 1):
+        current = [i]
+        for j, e in enumerate(expected, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (p != e)))
+        previous = current
+    return previous[-1] / max(len(expected), 1)
+
+
+def run_backend(backend: str, lines: List[Tuple[Image.Image, str]], batch_size: int, repeat: int) -> dict:
+    service = OCRService(use_transformers=True, trocr_backend=backend, trocr_batch_size=batch_size)
+    if service.trocr_backend != backend:
+        raise RuntimeError(f"Backend '{backend}' could not be loaded (got '{service.trocr_backend}')")
+
+    crops = [image for image, _ in lines]
+    # Warmup: first call pays for lazy initialization
+    service._recognize_lines_trocr(crops[:batch_size])
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predictions = service._recognize_lines_trocr(crops)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    cer = sum(character_error_rate(p.strip().lower(), t.lower()) for p, (_, t) in zip(predictions, lines)) / len(lines)
+    return {"backend": backend, "seconds": best, "lines_per_sec": len(lines) / best, "cer": cer}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=64, help="Number of synthetic text lines")
+    parser.add_argument("--batch-size", type=int, default=16, help="TrOCR batch size")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per backend (best is reported)")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], help="Backends to compare")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    results = [run_backend(backend, lines, args.batch_size, args.repeat) for backend in args.backends]
+
+    print(f"\n{'backend':<10}{'seconds':>10}{'lines/s':>10}{'CER':>8}")
+    for result in results:
+        print(f"{result['backend']:<10}{result['seconds']:>10.2f}{result['lines_per_sec']:>10.1f}{result['cer']:>8.3f}")
+    if len(results) > 1:
+        baseline = results[0]["seconds"]
+        for result in results[1:]:
+            print(f"{result['backend']} speedup over {results[0]['backend']}: {baseline / result['seconds']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """
+    Content-addressed, disk-backed store for OCR results with an LRU size cap.
+
+    Entries are JSON files named after their key. The in-memory index keeps
+    keys in least-recently-used order; when the total size on disk exceeds
+    max_bytes, the oldest entries are deleted.
+    """
+
+    KINDS = ("document", "page")
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the cache and index entries already on disk.
+
+        Args:
+            cache_dir: Directory where cache entries are stored
+            max_bytes: Maximum total size of stored entries
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._hits = {kind: 0 for kind in self.KINDS}
+        self._misses = {kind: 0 for kind in self.KINDS}
+        self._evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(namespace: str, *chunks: bytes) -> str:
+        """Build a SHA-256 key from a namespace (OCR configuration) and raw content."""
+        digest = hashlib.sha256(namespace.encode("utf-8"))
+        for chunk in chunks:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Return the SHA-256 hex digest of in-memory content."""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+        """Return the SHA-256 hex digest of a file, reading it in chunks."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU index from files on disk, ordered by last access time."""
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+        with self._lock:
+            self._evict()
+        logger.info(f"OCR cache loaded {len(self._entries)} entries ({self._total_bytes} bytes) from {self.cache_dir}")
+
+    def get(self, key: str, kind: str = "document") -> Optional[Dict[str, Any]]:
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key: Cache key from make_key
+            kind: Statistics bucket ('document' or 'page')
+
+        Returns:
+            Cached value or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses[kind] += 1
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            # mtime doubles as the last-access time when the index is rebuilt
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable OCR cache entry {key}: {str(e)}")
+            with self._lock:
+                self._remove(key)
+                self._misses[kind] += 1
+            return None
+
+        with self._lock:
+            self._hits[kind] += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store an entry, evicting least recently used entries if over the size cap."""
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write OCR cache entry {key}: {str(e)}")
+            return
+
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _remove(self, key: str) -> None:
+        """Drop an entry from the index and disk. Caller must hold the lock."""
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until under the cap. Caller must hold the lock."""
+        while self._entries and self._total_bytes > self.max_bytes:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size of the cache."""
+        with self._lock:
+            result: Dict[str, Any] = {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+            for kind in self.KINDS:
+                hits, misses = self._hits[kind], self._misses[kind]
+                result[kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                }
+            return result
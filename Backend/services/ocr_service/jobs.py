@@ -0,0 +1,228 @@
+import math
+import time
+import uuid
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the OCR job queue has no free slots."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"OCR queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class OCRJob:
+    """A unit of OCR work tracked from submission to completion."""
+
+    def __init__(self, name: str = ""):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+    @property
+    def queue_wait_ms(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return round((self.started_at - self.submitted_at) * 1000, 1)
+
+    @property
+    def run_ms(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at) * 1000, 1)
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        """Serialize job status and timing for API responses."""
+        data = {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "queue_wait_ms": self.queue_wait_ms,
+            "run_ms": self.run_ms,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.status == "done":
+            data["result"] = self.result
+        return data
+
+
+class OCRJobQueue:
+    """
+    Bounded worker pool for CPU-bound OCR jobs with admission control.
+
+    At most max_workers jobs run at once and at most max_queue more wait for a
+    worker; further submissions are rejected with QueueFullError so callers can
+    answer 429 instead of piling work up in memory.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 8, job_ttl: float = 3600.0):
+        """
+        Args:
+            max_workers: Number of jobs processed concurrently
+            max_queue: Number of jobs allowed to wait for a worker
+            job_ttl: Seconds finished jobs are kept for polling
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr-worker")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, OCRJob] = {}
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+    def _estimate_retry_after(self) -> int:
+        """Estimate seconds until a slot frees up from recent job durations. Caller must hold the lock."""
+        run_times = [job["run_ms"] for job in self._recent if job["run_ms"] is not None]
+        avg_run_s = (sum(run_times) / len(run_times) / 1000) if run_times else 5.0
+        # With every worker busy, a slot frees up roughly once per avg_run_s / max_workers
+        return max(1, math.ceil(avg_run_s / self.max_workers))
+
+    def check_capacity(self) -> None:
+        """Raise QueueFullError if a new job would be rejected."""
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise QueueFullError(self._estimate_retry_after())
+
+    def idle_workers(self) -> int:
+        """Return the number of workers not busy with or reserved for a job."""
+        with self._lock:
+            return max(0, self.max_workers - self._running - self._queued)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, name: str = "",
+               cleanup: Optional[Callable[[], None]] = None, track: bool = False, **kwargs: Any) -> OCRJob:
+        """
+        Queue fn(*args, **kwargs) on the worker pool.
+
+        Args:
+            fn: Callable performing the OCR work
+            name: Label for logs and status (e.g. file name)
+            cleanup: Called after the job finishes, whether it succeeded or not
+            track: Keep the job (and its result) for polling with get() for job_ttl
+
+        Returns:
+            The job; await asyncio.wrap_future(job.future) for the result
+
+        Raises:
+            QueueFullError: If all workers are busy and the queue is full
+        """
+        return self.submit_many(fn, [args], names=[name], cleanups=[cleanup], track=track, **kwargs)[0]
+
+    def submit_many(self, fn: Callable[..., Any], calls: List[tuple], names: Optional[List[str]] = None,
+                    cleanups: Optional[List[Optional[Callable[[], None]]]] = None, track: bool = False,
+                    **kwargs: Any) -> List[OCRJob]:
+        """
+        Queue fn(*args, **kwargs) for every args tuple in calls, admitting all of them or none.
+
+        Args:
+            fn: Callable performing the OCR work
+            calls: Positional arguments of every job
+            names: Label of every job for logs and status
+            cleanups: Called after each job finishes, whether it succeeded or not
+            track: Keep the jobs (and their results) for polling with get() for job_ttl;
+                jobs awaited by their caller aren't kept
+
+        Returns:
+            The jobs, in the order of calls
+
+        Raises:
+            QueueFullError: If the free slots can't take all of the jobs; none is queued then
+        """
+        names = names or [""] * len(calls)
+        cleanups = cleanups or [None] * len(calls)
+        jobs = [OCRJob(name=name) for name in names]
+        with self._lock:
+            self._prune()
+            if self._queued + self._running + len(jobs) > self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise QueueFullError(self._estimate_retry_after())
+            self._queued += len(jobs)
+            if track:
+                for job in jobs:
+                    self._jobs[job.id] = job
+
+        for job, args, cleanup in zip(jobs, calls, cleanups):
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs, cleanup)
+        return jobs
+
+    def _run(self, job: OCRJob, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any],
+             cleanup: Optional[Callable[[], None]]) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        job.started_at = time.time()
+        job.status = "running"
+
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "done"
+            return job.result
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            raise
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                if job.status == "done":
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                self._recent.append(job.to_dict())
+            logger.info(f"OCR job {job.id} ({job.name}) {job.status}: waited {job.queue_wait_ms} ms, ran {job.run_ms} ms")
+            if cleanup:
+                cleanup()
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        """Return a tracked job by id, or None if it is unknown or expired."""
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than job_ttl. Caller must hold the lock."""
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, counters and timing of recent jobs."""
+        with self._lock:
+            self._prune()
+            recent = list(self._recent)
+            waits = [job["queue_wait_ms"] for job in recent if job["queue_wait_ms"] is not None]
+            runs = [job["run_ms"] for job in recent if job["run_ms"] is not None]
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_queue_wait_ms": round(sum(waits) / len(waits), 1) if waits else None,
+                "avg_run_ms": round(sum(runs) / len(runs), 1) if runs else None,
+                "recent_jobs": recent[-10:],
+            }
@@ -1,7 +1,18 @@
+import os
+import json
+import asyncio
+import hashlib
+import tempfile
+import threading
+import concurrent.futures
+from typing import List, Tuple
 import uvicorn
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from ocr import OCRService
+from cache import OCRCache
+from jobs import OCRJobQueue, QueueFullError
 import logging
 
 # Configure logging (optional, if not handled by OCRService)
@@ -30,18 +41,77 @@ app.add_middleware(
 
 # --- Initialize OCR Service --- 
 try:
+    # Results are cached by content, so re-uploaded documents skip OCR entirely
+    ocr_cache = OCRCache(
+        cache_dir=os.getenv("OCR_CACHE_DIR", "ocr_cache"),
+        max_bytes=int(os.getenv("OCR_CACHE_MAX_MB", "512")) * 1024 * 1024,
+    )
     # Initialize with Transformers enabled (adjust if needed)
-    ocr_service = OCRService(use_transformers=True) 
+    ocr_service = OCRService(
+        use_transformers=True,
+        cache=ocr_cache,
+        render_dpi=int(os.getenv("OCR_RENDER_DPI", "150")),
+        grayscale=os.getenv("OCR_RENDER_GRAYSCALE", "1") == "1",
+        tesseract_lang=os.getenv("OCR_TESSERACT_LANG", "eng"),
+        trocr_backend=os.getenv("OCR_TROCR_BACKEND", "torch"),
+        onnx_cache_dir=os.getenv("OCR_ONNX_CACHE_DIR", "onnx_models"),
+    )
 except Exception as e:
     logger.error(f"Failed to initialize OCR Service: {e}")
     # You might want to handle this more gracefully, maybe exit or run without OCR
     ocr_service = None 
 
-# --- API Endpoint --- 
-@app.post("/ocr")
-async def process_pdf_endpoint(file: UploadFile = File(...)):
+# --- OCR worker pool ---
+# OCR is CPU-bound; running it on a bounded pool keeps the event loop free for
+# other uploads and health checks and rejects work beyond the queue limit.
+ocr_jobs = OCRJobQueue(
+    max_workers=int(os.getenv("OCR_WORKERS", "2")),
+    max_queue=int(os.getenv("OCR_MAX_QUEUE", "8")),
+)
+
+# Uploads are copied to disk in chunks of this size instead of being read into memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def spool_upload(file: UploadFile, suffix: str = "") -> Tuple[str, str]:
     """
-    Receives a PDF file upload, extracts text using OCRService, and returns the text.
+    Stream an upload into a temporary file, hashing it on the way.
+    
+    Returns:
+        Path of the temporary file (the caller removes it) and SHA-256 of the contents
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=os.getenv("OCR_SPOOL_DIR"))
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+def remove_spooled(path: str) -> None:
+    """Delete a spooled upload, ignoring files that are already gone."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def queue_full_error(e: QueueFullError) -> HTTPException:
+    """Build the 429 response for a saturated worker pool."""
+    return HTTPException(
+        status_code=429,
+        detail="OCR service is busy, please retry later.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+async def submit_pdf_job(file: UploadFile, track: bool = False):
+    """
+    Validate a PDF upload, spool it to disk and queue its OCR on the worker pool.
+    
+    The spooled file is removed when the job finishes. Only tracked jobs are
+    kept for polling via /ocr/jobs/{job_id}.
     """
     if not ocr_service:
         raise HTTPException(status_code=503, detail="OCR Service is not available")
@@ -49,14 +119,66 @@ async def process_pdf_endpoint(file: UploadFile = File(...)):
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are accepted.")
 
+    # Reject early, before spending disk and time on the upload
     try:
-        logger.info(f"Received file: {file.filename}")
-        # Read file content as bytes
-        file_bytes = await file.read()
-        
-        # Process using OCR service
-        # Pass file_bytes and explicitly state file_type
-        result = ocr_service.extract_text(file_bytes=file_bytes, file_type='pdf')
+        ocr_jobs.check_capacity()
+    except QueueFullError as e:
+        raise queue_full_error(e)
+
+    logger.info(f"Received file: {file.filename}")
+    # Spool the upload to disk so large PDFs are never held in memory as a whole
+    path, content_hash = await spool_upload(file, suffix=".pdf")
+    try:
+        # Pass the spooled path and explicitly state file_type
+        return ocr_jobs.submit(
+            ocr_service.extract_text,
+            file_path=path,
+            file_type='pdf',
+            content_hash=content_hash,
+            name=file.filename or "",
+            cleanup=lambda: remove_spooled(path),
+            track=track,
+        )
+    except QueueFullError as e:
+        remove_spooled(path)
+        raise queue_full_error(e)
+
+# Upper bound on files accepted by /ocr/batch in one request
+BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", "32"))
+# Page records /ocr/stream buffers ahead of a slow client before the worker waits for it
+STREAM_BUFFER_RECORDS = int(os.getenv("OCR_STREAM_BUFFER_RECORDS", "8"))
+# A client that doesn't read for this long is treated as gone and its stream is stopped
+STREAM_STALL_SECONDS = float(os.getenv("OCR_STREAM_STALL_SECONDS", "60"))
+
+def batch_file_type(content_type: str) -> str:
+    """Map an upload content type to the OCRService file type, or '' if unsupported."""
+    if content_type == "application/pdf":
+        return "pdf"
+    if content_type and content_type.startswith("image/"):
+        return "image"
+    return ""
+
+def split_into_groups(entries: List[dict], count: int) -> List[List[dict]]:
+    """Spread files over count groups of roughly equal total size, largest files first."""
+    groups = [[] for _ in range(count)]
+    sizes = [0] * count
+    for entry in sorted(entries, key=lambda e: e["size"], reverse=True):
+        smallest = sizes.index(min(sizes))
+        groups[smallest].append(entry)
+        sizes[smallest] += entry["size"]
+    return [group for group in groups if group]
+
+# --- API Endpoint --- 
+@app.post("/ocr")
+async def process_pdf_endpoint(file: UploadFile = File(...)):
+    """
+    Receives a PDF file upload, extracts text using OCRService, and returns the text.
+    """
+    job = await submit_pdf_job(file)
+
+    try:
+        # Process using OCR service on the worker pool
+        result = await asyncio.wrap_future(job.future)
         
         logger.info(f"Successfully processed {file.filename}")
         return {"text": result.get("text", ""), "pages": result.get("pages", 0)}
@@ -65,6 +187,230 @@ async def process_pdf_endpoint(file: UploadFile = File(...)):
         logger.error(f"Error processing file {file.filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error processing file: {str(e)}")
 
+@app.post("/ocr/batch")
+async def process_batch_endpoint(files: List[UploadFile] = File(...)):
+    """
+    Receives several PDFs and images in one multipart request and returns the text of each, keyed by file name.
+    Pages of all files share OCR model batches; large batches are spread over idle workers.
+    """
+    if not ocr_service:
+        raise HTTPException(status_code=503, detail="OCR Service is not available")
+
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files. At most {BATCH_MAX_FILES} files are accepted per batch.")
+
+    for file in files:
+        if not batch_file_type(file.content_type):
+            raise HTTPException(status_code=400, detail=f"Invalid file type for {file.filename}. Only PDF and image files are accepted.")
+
+    try:
+        ocr_jobs.check_capacity()
+    except QueueFullError as e:
+        raise queue_full_error(e)
+
+    logger.info(f"Received batch of {len(files)} files")
+    entries = []
+    try:
+        for index, file in enumerate(files):
+            name = file.filename or f"file_{index + 1}"
+            # Keep results of files uploaded under the same name apart; a generated
+            # name may itself be taken by another upload, so count up until it is free
+            used = {entry["name"] for entry in entries}
+            if name in used:
+                base, copy = name, index + 1
+                while name in used:
+                    name = f"{base} ({copy})"
+                    copy += 1
+            path, content_hash = await spool_upload(file)
+            entries.append({
+                "name": name,
+                "file_path": path,
+                "file_type": batch_file_type(file.content_type),
+                "content_hash": content_hash,
+                "size": os.path.getsize(path),
+            })
+    except BaseException:
+        for entry in entries:
+            remove_spooled(entry["file_path"])
+        raise
+
+    groups = split_into_groups(entries, max(1, min(len(entries), ocr_jobs.idle_workers())))
+    paths = [[entry["file_path"] for entry in group] for group in groups]
+    # All groups are admitted at once: slots may have been taken while the files were spooled
+    try:
+        jobs = ocr_jobs.submit_many(
+            ocr_service.extract_batch,
+            [(group,) for group in groups],
+            names=[f"batch of {len(group)} files" for group in groups],
+            cleanups=[lambda group_paths=group_paths: [remove_spooled(path) for path in group_paths]
+                      for group_paths in paths],
+        )
+    except QueueFullError as e:
+        for entry in entries:
+            remove_spooled(entry["file_path"])
+        raise queue_full_error(e)
+
+    try:
+        outputs = {}
+        for result in await asyncio.gather(*(asyncio.wrap_future(job.future) for job in jobs)):
+            outputs.update(result)
+    except Exception as e:
+        logger.error(f"Error processing batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error processing batch: {str(e)}")
+
+    logger.info(f"Successfully processed batch of {len(entries)} files in {len(jobs)} jobs")
+    return {
+        "files": len(entries),
+        "results": {
+            entry["name"]: {
+                "text": outputs[entry["name"]].get("text", ""),
+                "pages": outputs[entry["name"]].get("pages", 0),
+            }
+            for entry in entries
+        },
+    }
+
+@app.post("/ocr/jobs", status_code=202)
+async def submit_pdf_job_endpoint(file: UploadFile = File(...)):
+    """
+    Queues a PDF for OCR and returns immediately with a job id to poll.
+    Intended for very large documents that would outlive an HTTP request.
+    """
+    job = await submit_pdf_job(file, track=True)
+    return job.to_dict()
+
+@app.get("/ocr/jobs/{job_id}")
+async def get_pdf_job_endpoint(job_id: str):
+    """
+    Returns the status and timing of an OCR job, with the extracted text once it is done.
+    """
+    job = ocr_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    data = job.to_dict()
+    if job.status == "done":
+        data["text"] = job.result.get("text", "")
+        data["pages"] = job.result.get("pages", 0)
+    return data
+
+@app.post("/ocr/stream")
+async def process_pdf_stream_endpoint(
+    file: UploadFile = File(...),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+):
+    """
+    Receives a PDF file upload and streams per-page OCR results as they become ready.
+    
+    Each page is emitted as {"type": "page", "seq", "page", "text", "method", "elapsed_ms"}
+    in page order. A final {"type": "summary", ...} record closes the stream.
+    Use format=sse for Server-Sent Events instead of newline-delimited JSON.
+    """
+    if not ocr_service:
+        raise HTTPException(status_code=503, detail="OCR Service is not available")
+
+    if file.content_type != "application/pdf":
+        raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are accepted.")
+
+    try:
+        ocr_jobs.check_capacity()
+    except QueueFullError as e:
+        raise queue_full_error(e)
+
+    logger.info(f"Received file for streaming: {file.filename}")
+    path, _ = await spool_upload(file, suffix=".pdf")
+    filename = file.filename
+
+    loop = asyncio.get_running_loop()
+    # Bounded, so a slow client holds the worker back instead of it buffering every page
+    records: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_RECORDS)
+    cancelled = threading.Event()
+    done = object()
+
+    def put(record) -> bool:
+        """Hand a record to the event loop, waiting while the queue is full. False if the client is gone."""
+        if cancelled.is_set():
+            return False
+        future = asyncio.run_coroutine_threadsafe(records.put(record), loop)
+        try:
+            future.result(timeout=STREAM_STALL_SECONDS)
+            return True
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"Client stopped reading the stream of {filename}, stopping")
+            future.cancel()
+            cancelled.set()
+            return False
+
+    def end_stream():
+        # Runs on the event loop; makes room if the reader stalled
+        if records.full():
+            records.get_nowait()
+        records.put_nowait(done)
+
+    def produce_records():
+        # Runs on the worker pool and hands records over to the event loop
+        try:
+            # Pages are OCR'd inline so the stream holds exactly one OCR worker
+            for record in ocr_service.iter_pdf_pages(file_path=path, max_workers=1):
+                if not put(record):
+                    break
+            logger.info(f"Successfully streamed {filename}")
+        except Exception as e:
+            logger.error(f"Error streaming file {filename}: {str(e)}")
+            put({"type": "error", "detail": f"Internal server error processing file: {str(e)}"})
+        finally:
+            if not put(done):
+                loop.call_soon_threadsafe(end_stream)
+
+    try:
+        ocr_jobs.submit(produce_records, name=filename or "", cleanup=lambda: remove_spooled(path))
+    except QueueFullError as e:
+        remove_spooled(path)
+        raise queue_full_error(e)
+
+    async def encode_records():
+        try:
+            while (record := await records.get()) is not done:
+                yield encode_record(record, format)
+        finally:
+            # Stop OCR'ing pages nobody will read if the client disconnects,
+            # and free a worker waiting for room in the queue
+            cancelled.set()
+            while not records.empty():
+                records.get_nowait()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(encode_records(), media_type=media_type)
+
+def encode_record(record: dict, format: str) -> str:
+    """Serialize a streaming record as an NDJSON line or an SSE event."""
+    payload = json.dumps(record, ensure_ascii=False)
+    if format == "sse":
+        return f"event: {record['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@app.get("/ocr/cache/stats")
+async def cache_stats_endpoint():
+    """Returns hit/miss statistics of the OCR result cache."""
+    if not ocr_service:
+        raise HTTPException(status_code=503, detail="OCR Service is not available")
+    return ocr_service.cache_stats()
+
+@app.get("/ocr/stats")
+async def queue_stats_endpoint():
+    """Returns worker pool queue depth, counters and timing of recent jobs, and OCR backend throughput."""
+    stats = ocr_jobs.stats()
+    if ocr_service:
+        stats["backends"] = ocr_service.planner_stats()
+    return stats
+
+@app.get("/health")
+async def health_check():
+    return {
+        "status": "ok" if ocr_service else "unavailable",
+        "queue_depth": ocr_jobs.stats()["queue_depth"],
+    }
+
 # --- Run the server (for local development) --- 
 if __name__ == "__main__":
     # Use port 8001 to avoid conflict with other services (like frontend dev server)
@@ -1,7 +1,9 @@
 import os
 import io
 import base64
-from typing import Dict, List, Optional, Union, Any
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
 import numpy as np
 from PIL import Image
 import fitz  # PyMuPDF for PDF handling
@@ -9,33 +11,71 @@ import pytesseract
 import torch
 from transformers import TrOCRProcessor, VisionEncoderDecoderModel
 import logging
+from layout import segment_lines
+from cache import OCRCache
+from tesseract_engine import TesseractEngine
+from trocr_onnx import load_onnx_trocr
+from planner import BackendPlanner, image_regions_without_text
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+NO_OCR_TEXT = "Text extraction failed - no OCR method available"
+TROCR_MODEL_ID = "microsoft/trocr-base-printed"
+
+def _join_text(text: str, addition: str) -> str:
+    """Append OCR'd text to text that is already known for a page."""
+    if not addition.strip():
+        return text
+    if not text.strip():
+        return addition
+    return text.rstrip() + "\n\n" + addition
+
 class OCRService:
     """Service for performing OCR on images and PDFs using multiple backends with fallbacks."""
     
-    def __init__(self, use_transformers: bool = True, tesseract_cmd: Optional[str] = None):
+    def __init__(self, use_transformers: bool = True, tesseract_cmd: Optional[str] = None,
+                 trocr_batch_size: int = 16, trocr_max_new_tokens: int = 64,
+                 cache: Optional[OCRCache] = None, render_dpi: int = 150,
+                 grayscale: bool = True, ocr_pages_per_batch: int = 8,
+                 tesseract_lang: str = "eng", trocr_backend: str = "torch",
+                 onnx_cache_dir: str = "onnx_models"):
         """
         Initialize the OCR service with fallback options.
         
         Args:
             use_transformers: Whether to use the Transformer-based OCR model (TrOCR)
             tesseract_cmd: Path to tesseract executable if needed (optional)
+            trocr_batch_size: Number of text-line crops passed to TrOCR per generate() call
+            trocr_max_new_tokens: Upper bound on generated tokens per text line
+            cache: Result cache for documents and rendered pages (optional)
+            render_dpi: Resolution at which scanned PDF pages are rendered for OCR
+            grayscale: Render pages in grayscale (a third of the memory of RGB)
+            ocr_pages_per_batch: Scanned pages held in memory and recognized together
+            tesseract_lang: Tesseract language(s), e.g. 'eng' or 'eng+rus'
+            trocr_backend: 'torch' (PyTorch) or 'onnx' (ONNX Runtime, int8, CPU only)
+            onnx_cache_dir: Directory where the exported ONNX model is kept
         """
         self.use_tesseract = False
         self.use_transformers = False
+        self.trocr_backend = None
+        self.trocr_batch_size = max(1, trocr_batch_size)
+        self.trocr_max_new_tokens = trocr_max_new_tokens
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.cache = cache
+        self.render_dpi = render_dpi
+        self.render_colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+        self.ocr_pages_per_batch = max(1, ocr_pages_per_batch)
         
         # Setup Tesseract if available
         try:
             if tesseract_cmd:
                 pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
-            # Quick test to see if Tesseract is available
-            pytesseract.get_tesseract_version()
+            # Keeps a persistent engine per worker thread when tesserocr is installed
+            self.tesseract = TesseractEngine(lang=tesseract_lang)
             self.use_tesseract = True
-            logger.info("Tesseract OCR is available")
+            logger.info(f"Tesseract OCR is available ({self.tesseract.mode})")
         except Exception as e:
             logger.warning(f"Tesseract OCR is not available: {str(e)}")
         
@@ -43,15 +83,28 @@ class OCRService:
         if use_transformers:
             try:
                 logger.info("Loading TrOCR model...")
-                self.processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-printed")
-                self.model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-printed")
+                self.processor = TrOCRProcessor.from_pretrained(TROCR_MODEL_ID)
+                self.model = None
                 
-                # Move to GPU if available
-                if torch.cuda.is_available():
-                    self.model.to("cuda")
-                    logger.info("TrOCR model loaded on GPU")
-                else:
-                    logger.info("TrOCR model loaded on CPU")
+                # ONNX Runtime path for CPU-only nodes
+                if trocr_backend == "onnx" and self.device == "cpu":
+                    try:
+                        self.model = load_onnx_trocr(TROCR_MODEL_ID, onnx_cache_dir)
+                        self.trocr_backend = "onnx"
+                    except Exception as e:
+                        logger.warning(f"Failed to load ONNX TrOCR model, using PyTorch: {str(e)}")
+                
+                if self.model is None:
+                    self.model = VisionEncoderDecoderModel.from_pretrained(TROCR_MODEL_ID)
+                    self.model.eval()
+                    self.trocr_backend = "torch"
+                    
+                    # Move to GPU if available
+                    if self.device == "cuda":
+                        self.model.to("cuda")
+                        logger.info("TrOCR model loaded on GPU")
+                    else:
+                        logger.info("TrOCR model loaded on CPU")
                 
                 self.use_transformers = True
             except Exception as e:
@@ -60,95 +113,457 @@ class OCRService:
         # Check if we have at least one OCR method available
         if not self.use_tesseract and not self.use_transformers:
             logger.warning("No OCR method is available. Text extraction may be limited.")
+        
+        # Routes each image to TrOCR or Tesseract based on measured throughput
+        self.planner = BackendPlanner(trocr_seconds_per_line=0.05 if self.device == "cuda" else 0.3)
+        
+        # Results depend on which backends are active and how pages are rendered,
+        # so they are part of every cache key
+        self.cache_namespace = (f"ocr-v2|trocr={self.trocr_backend}|tesseract={self.use_tesseract}|lang={tesseract_lang}"
+                                f"|dpi={self.render_dpi}|gray={grayscale}")
     
-    def extract_text(self, file_bytes: Optional[bytes] = None, file_type: Optional[str] = None) -> Dict[str, Any]:
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return hit/miss statistics of the result cache."""
+        if not self.cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def planner_stats(self) -> Dict[str, Any]:
+        """Return the throughput estimates used for backend selection."""
+        return self.planner.stats()
+    
+    def _page_cache_key(self, pix: "fitz.Pixmap", samples: bytes) -> Optional[str]:
+        """Build the cache key of a rendered page from its pixels."""
+        if not self.cache:
+            return None
+        header = f"{pix.width}x{pix.height}x{pix.n}".encode("ascii")
+        return OCRCache.make_key(self.cache_namespace, header, samples)
+    
+    def _cached_page_text(self, key: Optional[str]) -> Optional[str]:
+        """Look up the OCR text of a rendered page in the cache."""
+        if not key:
+            return None
+        cached = self.cache.get(key, kind="page")
+        return cached["text"] if cached else None
+    
+    def _store_page_text(self, key: Optional[str], text: str) -> None:
+        """Remember the OCR text of a rendered page."""
+        if key and text != NO_OCR_TEXT:
+            self.cache.put(key, {"text": text})
+    
+    @staticmethod
+    def _open_pdf(file_bytes: Optional[bytes] = None, file_path: Optional[str] = None) -> "fitz.Document":
+        """Open a PDF from disk when a path is given, otherwise from memory."""
+        if file_path:
+            # MuPDF reads objects from the file on demand instead of loading it whole
+            return fitz.open(file_path, filetype="pdf")
+        return fitz.open(stream=file_bytes, filetype="pdf")
+    
+    def _render_page(self, page: "fitz.Page", clip: Optional["fitz.Rect"] = None) -> Tuple[Image.Image, Optional[str]]:
+        """
+        Render a PDF page (or a region of it) for OCR at the configured DPI and colourspace.
+        
+        Returns:
+            The page image and its cache key (None if caching is disabled)
+        """
+        pix = page.get_pixmap(dpi=self.render_dpi, colorspace=self.render_colorspace, alpha=False, clip=clip)
+        samples = pix.samples
+        page_key = self._page_cache_key(pix, samples)
+        img = Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), samples)
+        # Release the pixmap before the next page is rendered; only the PIL copy survives
+        del pix, samples
+        return img, page_key
+    
+    def _plan_page(self, page: "fitz.Page") -> Tuple[str, List[Tuple[Image.Image, Optional[str]]], str]:
+        """
+        Decide which parts of a PDF page need OCR.
+        
+        Pages with a text layer keep it, and only their image blocks without text
+        (figures, scanned inserts) are rendered for OCR. Pages without a text layer
+        are rendered whole. Regions already in the page cache are resolved here.
+        
+        Returns:
+            Text known without OCR, (image, cache key) pairs that still need OCR,
+            and where the known text came from ('text_layer', 'cache' or '')
+        """
+        text = page.get_text()
+        if not (self.use_tesseract or self.use_transformers):
+            return text, [], "text_layer"
+        
+        if text.strip():
+            clips = image_regions_without_text(page)
+            source = "text_layer"
+        else:
+            clips = [None]
+            source = ""
+        
+        pending = []
+        for clip in clips:
+            img, key = self._render_page(page, clip)
+            cached_text = self._cached_page_text(key)
+            if cached_text is not None:
+                text = _join_text(text, cached_text)
+                source = source or "cache"
+            else:
+                pending.append((img, key))
+        return text, pending, source
+    
+    def extract_text(self, file_bytes: Optional[bytes] = None, file_type: Optional[str] = None,
+                     file_path: Optional[str] = None, content_hash: Optional[str] = None) -> Dict[str, Any]:
         """
         Extract text from various file types.
         
         Args:
             file_bytes: File as bytes
             file_type: Type of file ('pdf', 'image', or auto-detect)
+            file_path: Path to the file on disk, used instead of file_bytes for large files
+            content_hash: SHA-256 hex digest of the file contents if already known
             
         Returns:
             Dictionary with extracted text and metadata
         """
-        if not file_bytes:
-            raise ValueError("file_bytes must be provided")
+        if not file_bytes and not file_path:
+            raise ValueError("file_bytes or file_path must be provided")
         
         # Determine file type if not specified
         if not file_type:
-            # Try to detect from bytes (simple magic bytes check)
-            if file_bytes[:4] == b'%PDF':
-                file_type = 'pdf'
-            else:
-                try:
-                    # Try to open as image
-                    Image.open(io.BytesIO(file_bytes))
-                    file_type = 'image'
-                except:
-                    file_type = 'unknown'
+            file_type = self._detect_file_type(file_bytes, file_path)
+        
+        if file_type not in ('pdf', 'image'):
+            # For unknown file types, try to extract text directly if possible
+            return {"text": "File type not supported for text extraction", "pages": 0}
+        
+        # Identical uploads are answered from the cache without touching the document
+        doc_key = self._document_cache_key(file_type, file_bytes, file_path, content_hash)
+        if doc_key:
+            cached = self.cache.get(doc_key, kind="document")
+            if cached is not None:
+                return cached
         
         # Process based on file type
         if file_type == 'pdf':
-            return self.process_pdf(file_bytes)
-        elif file_type == 'image':
-            text = self.process_image(file_bytes)
-            return {"text": text, "pages": 1}
+            result = self.process_pdf(file_bytes, file_path=file_path)
         else:
-            # For unknown file types, try to extract text directly if possible
-            return {"text": "File type not supported for text extraction", "pages": 0}
+            text = self.process_image(file_path or file_bytes)
+            result = {"text": text, "pages": 1}
+        
+        self._store_document_result(doc_key, result)
+        return result
+    
+    def extract_batch(self, files: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Extract text from several PDFs and images in one pass.
+        
+        Scanned pages and images from all files share the same OCR batches, so
+        TrOCR sees many text lines per generate() call instead of one file's worth.
+        
+        Args:
+            files: Dictionaries with "name" and "file_path" or "file_bytes", and
+                optionally "file_type" and "content_hash"
+            
+        Returns:
+            Extraction result for every file, keyed by its name
+        """
+        outputs: Dict[str, Dict[str, Any]] = {}
+        # (name, page results, document cache key) of files still waiting for OCR
+        pending = []
+        # (page results, index, image, page cache key) shared by all files
+        scanned = []
+        
+        for entry in files:
+            name = entry["name"]
+            file_bytes = entry.get("file_bytes")
+            file_path = entry.get("file_path")
+            file_type = entry.get("file_type") or self._detect_file_type(file_bytes, file_path)
+            
+            if file_type not in ('pdf', 'image'):
+                outputs[name] = {"text": "File type not supported for text extraction", "pages": 0}
+                continue
+            
+            doc_key = self._document_cache_key(file_type, file_bytes, file_path, entry.get("content_hash"))
+            if doc_key:
+                cached = self.cache.get(doc_key, kind="document")
+                if cached is not None:
+                    outputs[name] = cached
+                    continue
+            
+            try:
+                if file_type == 'pdf':
+                    doc = self._open_pdf(file_bytes, file_path)
+                    try:
+                        results = self._queue_pdf_pages(doc, scanned)
+                    finally:
+                        doc.close()
+                else:
+                    results = [{"page": 1, "text": ""}]
+                    img = Image.open(file_path or io.BytesIO(file_bytes))
+                    img.load()
+                    scanned.append((results, 0, img, None))
+                    if len(scanned) >= self.ocr_pages_per_batch:
+                        self._ocr_scanned_pages(scanned)
+                        scanned.clear()
+            except Exception as e:
+                logger.error(f"Error processing {name}: {str(e)}")
+                outputs[name] = {"text": f"Error processing file: {str(e)}", "pages": 0}
+                continue
+            
+            pending.append((name, results, doc_key))
+        
+        if scanned:
+            self._ocr_scanned_pages(scanned)
+        
+        for name, results, doc_key in pending:
+            outputs[name] = self._build_document_result(results)
+            self._store_document_result(doc_key, outputs[name])
+        
+        return outputs
+    
+    @staticmethod
+    def _detect_file_type(file_bytes: Optional[bytes] = None, file_path: Optional[str] = None) -> str:
+        """Detect 'pdf', 'image' or 'unknown' from the file contents."""
+        # Try to detect from bytes (simple magic bytes check)
+        if file_path:
+            with open(file_path, "rb") as f:
+                header = f.read(4)
+        else:
+            header = file_bytes[:4]
+        if header == b'%PDF':
+            return 'pdf'
+        try:
+            # Try to open as image
+            Image.open(file_path or io.BytesIO(file_bytes))
+            return 'image'
+        except:
+            return 'unknown'
     
-    def process_pdf(self, file_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    def _document_cache_key(self, file_type: str, file_bytes: Optional[bytes] = None,
+                            file_path: Optional[str] = None, content_hash: Optional[str] = None) -> Optional[str]:
+        """Build the cache key of a whole document from its content hash."""
+        if not self.cache:
+            return None
+        if not content_hash:
+            content_hash = OCRCache.hash_file(file_path) if file_path else OCRCache.hash_bytes(file_bytes)
+        return OCRCache.make_key(f"{self.cache_namespace}|{file_type}", content_hash.encode("ascii"))
+    
+    def _store_document_result(self, doc_key: Optional[str], result: Dict[str, Any]) -> None:
+        """Remember the result of a whole document."""
+        # Failed extractions report zero pages and are not worth remembering; neither
+        # are documents with a page OCR failed on, so they are retried next time
+        if not doc_key or result.get("pages", 0) == 0 or result.get("text") == NO_OCR_TEXT:
+            return
+        if any(page.get("ocr_failed") for page in result.get("page_results", [])):
+            return
+        self.cache.put(doc_key, result)
+    
+    def process_pdf(self, file_bytes: Optional[bytes] = None, file_path: Optional[str] = None) -> Dict[str, Any]:
         """
         Extract text from a PDF file using PyMuPDF with OCR fallback.
         
         Args:
             file_bytes: PDF file as bytes
+            file_path: Path to the PDF on disk (preferred for large files)
             
         Returns:
             Dictionary with extracted text and metadata
         """
-        if not file_bytes:
-            raise ValueError("file_bytes must be provided")
+        if not file_bytes and not file_path:
+            raise ValueError("file_bytes or file_path must be provided")
         
         try:
             # Open PDF document
-            doc = fitz.open(stream=file_bytes, filetype="pdf")
+            doc = self._open_pdf(file_bytes, file_path)
+        except Exception as e:
+            logger.error(f"Error processing PDF: {str(e)}")
+            return {"text": f"Error processing PDF: {str(e)}", "pages": 0}
+        
+        try:
+            scanned = []
+            results = self._queue_pdf_pages(doc, scanned)
+            if scanned:
+                self._ocr_scanned_pages(scanned)
+            return self._build_document_result(results)
+        
+        except Exception as e:
+            logger.error(f"Error processing PDF: {str(e)}")
+            return {"text": f"Error processing PDF: {str(e)}", "pages": 0}
+        finally:
+            doc.close()
+    
+    def _queue_pdf_pages(self, doc: "fitz.Document", scanned: List[Tuple]) -> List[Dict[str, Any]]:
+        """
+        Read the text layer of every page and queue what it misses for OCR.
+        
+        Queued pages are recognized together so that TrOCR can batch text lines
+        across pages (and across documents when scanned is shared). The queue is
+        flushed whenever it reaches ocr_pages_per_batch pages.
+        
+        Args:
+            doc: Open PDF document
+            scanned: OCR queue of (page results, index, image, page cache key) tuples
+            
+        Returns:
+            Page results; queued pages get their text once the queue is flushed
+        """
+        results = []
+        for page_num, page in enumerate(doc):
+            # Use the text layer and queue scanned pages or image regions for OCR
+            try:
+                text, pending, _ = self._plan_page(page)
+            except Exception as e:
+                logger.error(f"Rendering failed on page {page_num+1}: {str(e)}")
+                text, pending = page.get_text(), []
+            
+            for img, page_key in pending:
+                scanned.append((results, len(results), img, page_key))
             
-            results = []
-            total_text = ""
+            results.append({
+                "page": page_num + 1,
+                "text": text
+            })
             
+            # Bound the number of rendered pages held in memory at once
+            if len(scanned) >= self.ocr_pages_per_batch:
+                self._ocr_scanned_pages(scanned)
+                scanned.clear()
+        
+        return results
+    
+    @staticmethod
+    def _build_document_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Assemble the extraction result of a document from its page results."""
+        total_text = "\n\n".join(result["text"] for result in results)
+        
+        return {
+            "pages": len(results),
+            "page_results": results,
+            "text": total_text.strip()
+        }
+    
+    def _ocr_scanned_pages(self, scanned: List[Tuple[List[Dict[str, Any]], int, Image.Image, Optional[str]]]) -> None:
+        """
+        OCR queued page images and write their text into the owning page results.
+        
+        Pages no OCR method succeeded on are marked with "ocr_failed" so that
+        their document is not cached.
+        """
+        try:
+            # Process with OCR
+            ocr_texts, methods = self._ocr_images([img for _, _, img, _ in scanned])
+            for (results, index, _, page_key), text, method in zip(scanned, ocr_texts, methods):
+                results[index]["text"] = _join_text(results[index]["text"], text)
+                if method == "none":
+                    results[index]["ocr_failed"] = True
+                else:
+                    self._store_page_text(page_key, text)
+        except Exception as e:
+            logger.error(f"OCR failed on scanned pages: {str(e)}")
+            for results, index, _, _ in scanned:
+                results[index]["ocr_failed"] = True
+    
+    def iter_pdf_pages(self, file_bytes: Optional[bytes] = None, max_workers: int = 1,
+                       file_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Extract text from a PDF page by page, yielding each page as soon as it is ready.
+        
+        Pages with a text layer are yielded immediately. Scanned pages are OCR'd
+        in the calling thread, or with max_workers > 1 on a small thread pool of
+        their own, in which case records may arrive out of page order. Every
+        record carries a sequence number; a final summary record follows the pages.
+        
+        Args:
+            file_bytes: PDF file as bytes
+            max_workers: Number of pages OCR'd concurrently; keep 1 when the caller
+                already runs on a bounded worker pool
+            file_path: Path to the PDF on disk (preferred for large files)
+            
+        Yields:
+            Page records ({"type": "page", "seq", "page", "text", "method", "elapsed_ms"})
+            followed by one {"type": "summary", ...} record
+        """
+        if not file_bytes and not file_path:
+            raise ValueError("file_bytes or file_path must be provided")
+        
+        started = time.perf_counter()
+        doc = self._open_pdf(file_bytes, file_path)
+        page_texts: Dict[int, str] = {}
+        seq = 0
+        
+        def make_record(result: Dict[str, Any]) -> Dict[str, Any]:
+            nonlocal seq
+            record = {"type": "page", "seq": seq, **result}
+            page_texts[result["page"]] = result["text"]
+            seq += 1
+            return record
+        
+        # Without a pool of its own, pages are OCR'd inline and arrive in order
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        try:
+            pending = set()
             for page_num, page in enumerate(doc):
-                # Try to extract text directly
-                text = page.get_text()
+                page_started = time.perf_counter()
+                # fitz documents are not thread-safe, so pages are rendered
+                # here and only the recognition runs on the pool
+                text, images, source = self._plan_page(page)
                 
-                # If no text was extracted (scanned PDF), try OCR
-                if not text.strip() and (self.use_tesseract or self.use_transformers):
-                    try:
-                        # Convert page to image
-                        pix = page.get_pixmap(alpha=False)
-                        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                        
-                        # Process with OCR
-                        text = self.process_image(img)
-                    except Exception as e:
-                        logger.error(f"OCR failed on page {page_num+1}: {str(e)}")
+                if not images:
+                    yield make_record({
+                        "page": page_num + 1,
+                        "text": text,
+                        "method": source or "text_layer",
+                        "elapsed_ms": round((time.perf_counter() - page_started) * 1000, 1),
+                    })
+                    continue
+                if executor is None:
+                    yield make_record(self._ocr_page(page_num + 1, text, images, source, page_started))
+                    continue
+                pending.add(executor.submit(self._ocr_page, page_num + 1, text, images, source, page_started))
                 
-                results.append({
-                    "page": page_num + 1,
-                    "text": text
-                })
-                total_text += text + "\n\n"
+                # Don't render too far ahead of the OCR workers
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                else:
+                    done = {future for future in pending if future.done()}
+                    pending -= done
+                for future in done:
+                    yield make_record(future.result())
+            
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield make_record(future.result())
             
-            return {
+            total_text = "\n\n".join(page_texts[page] for page in sorted(page_texts))
+            yield {
+                "type": "summary",
+                "seq": seq,
                 "pages": len(doc),
-                "page_results": results,
-                "text": total_text.strip()
+                "text": total_text.strip(),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
             }
-        
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            doc.close()
+    
+    def _ocr_page(self, page_number: int, text: str, images: List[Tuple[Image.Image, Optional[str]]],
+                  source: str, started: float) -> Dict[str, Any]:
+        """OCR the rendered images of a page and build its page record."""
+        try:
+            texts, methods = self._ocr_images([img for img, _ in images])
+            for (_, page_key), ocr_text in zip(images, texts):
+                text = _join_text(text, ocr_text)
+                self._store_page_text(page_key, ocr_text)
+            method = "+".join(dict.fromkeys(m for m in [source, *methods] if m))
         except Exception as e:
-            logger.error(f"Error processing PDF: {str(e)}")
-            return {"text": f"Error processing PDF: {str(e)}", "pages": 0}
+            logger.error(f"OCR failed on page {page_number}: {str(e)}")
+            method = "error"
+        
+        return {
+            "page": page_number,
+            "text": text,
+            "method": method,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
     
     def process_image(self, image: Union[str, bytes, Image.Image]) -> str:
         """
@@ -170,48 +585,149 @@ class OCRService:
         else:
             raise ValueError("Image must be a file path, bytes, or PIL Image")
         
+        texts, _ = self._ocr_images([img])
+        return texts[0]
+    
+    def _ocr_images(self, images: List[Image.Image]) -> Tuple[List[str], List[str]]:
+        """
+        Extract text from several images, batching TrOCR work across all of them.
+        
+        Each image is segmented into text lines and routed by the backend planner:
+        images with few lines go to TrOCR (one model call per line), dense ones to
+        Tesseract (cost grows with area, not line count).
+        
+        Args:
+            images: PIL Image objects (e.g. rendered pages of one document)
+            
+        Returns:
+            Extracted text and the OCR method used for each image, in the same order
+        """
+        texts = [NO_OCR_TEXT] * len(images)
+        methods = ["none"] * len(images)
+        trocr_jobs = []
+        tesseract_jobs = []
+        
+        for index, image in enumerate(images):
+            boxes = segment_lines(image) if self.use_transformers else []
+            backend = self.planner.choose(
+                lines=len(boxes),
+                megapixels=image.width * image.height / 1e6,
+                trocr=self.use_transformers,
+                tesseract=self.use_tesseract,
+            )
+            if backend == "trocr":
+                trocr_jobs.append((index, boxes))
+            elif backend == "tesseract":
+                tesseract_jobs.append(index)
+        
         # Try transformer-based OCR first if enabled
-        if self.use_transformers:
+        if trocr_jobs:
             try:
-                return self._process_with_trocr(img)
+                started = time.perf_counter()
+                trocr_texts = self._recognize_images_trocr(
+                    [images[index] for index, _ in trocr_jobs],
+                    [boxes for _, boxes in trocr_jobs],
+                )
+                self.planner.record("trocr", sum(len(boxes) for _, boxes in trocr_jobs), time.perf_counter() - started)
+                for (index, _), text in zip(trocr_jobs, trocr_texts):
+                    texts[index] = text
+                    methods[index] = "trocr"
             except Exception as e:
                 logger.warning(f"TrOCR failed, falling back to Tesseract: {str(e)}")
+                if self.use_tesseract:
+                    tesseract_jobs.extend(index for index, _ in trocr_jobs)
         
         # Try Tesseract if available
-        if self.use_tesseract:
+        for index in tesseract_jobs:
+            image = images[index]
             try:
-                return self._process_with_tesseract(img)
+                started = time.perf_counter()
+                texts[index] = self._process_with_tesseract(image)
+                self.planner.record("tesseract", image.width * image.height / 1e6, time.perf_counter() - started)
+                methods[index] = "tesseract"
             except Exception as e:
                 logger.error(f"Tesseract OCR failed: {str(e)}")
         
-        # If all OCR methods failed or are unavailable
-        return "Text extraction failed - no OCR method available"
+        # If all OCR methods failed or are unavailable, texts keep NO_OCR_TEXT
+        return texts, methods
     
     def _process_with_trocr(self, image: Image.Image) -> str:
         """Process image with TrOCR model."""
-        # Ensure image is RGB
-        if image.mode != "RGB":
-            image = image.convert("RGB")
+        return self._recognize_images_trocr([image])[0]
+    
+    def _recognize_images_trocr(self, images: List[Image.Image],
+                                line_boxes: Optional[List[List[Tuple[int, int, int, int]]]] = None) -> List[str]:
+        """
+        Segment images into text lines and recognize all lines in shared TrOCR batches.
+        
+        TrOCR is a single-line model, so each image is split into line crops first
+        (unless line_boxes from an earlier segmentation are given). Crops from every
+        image go through the model together and are then joined back per image in
+        reading order.
+        """
+        if line_boxes is None:
+            line_boxes = [segment_lines(image) for image in images]
         
-        # Preprocess image
-        pixel_values = self.processor(image, return_tensors="pt").pixel_values
-        if torch.cuda.is_available():
-            pixel_values = pixel_values.to("cuda")
+        crops = []
+        owners = []
+        for index, (image, boxes) in enumerate(zip(images, line_boxes)):
+            for box in boxes:
+                crop = image.crop(box)
+                # Ensure image is RGB; converting crops avoids an RGB copy of the whole page
+                if crop.mode != "RGB":
+                    crop = crop.convert("RGB")
+                crops.append(crop)
+                owners.append(index)
         
-        # Generate text
-        generated_ids = self.model.generate(pixel_values)
-        generated_text = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+        line_texts = self._recognize_lines_trocr(crops)
+        
+        page_lines = [[] for _ in images]
+        for owner, text in zip(owners, line_texts):
+            text = text.strip()
+            if text:
+                page_lines[owner].append(text)
+        return ["\n".join(lines) for lines in page_lines]
+    
+    def _recognize_lines_trocr(self, crops: List[Image.Image]) -> List[str]:
+        """Run TrOCR over text-line crops in size-bucketed batches."""
+        if not crops:
+            return []
+        
+        started = time.perf_counter()
+        results = [""] * len(crops)
+        
+        # Wide lines need more decoding steps than short ones. Ordering crops by
+        # aspect ratio keeps lines of similar length in the same batch, so
+        # generate() does not keep short lines waiting on the longest one.
+        order = sorted(range(len(crops)), key=lambda i: crops[i].width / max(crops[i].height, 1))
+        
+        for start in range(0, len(order), self.trocr_batch_size):
+            batch = order[start:start + self.trocr_batch_size]
+            
+            # Preprocess images
+            pixel_values = self.processor(images=[crops[i] for i in batch], return_tensors="pt").pixel_values
+            pixel_values = pixel_values.to(self.device)
+            
+            # Generate text
+            with torch.inference_mode():
+                generated_ids = self.model.generate(pixel_values, max_new_tokens=self.trocr_max_new_tokens)
+            generated_texts = self.processor.batch_decode(generated_ids, skip_special_tokens=True)
+            
+            for i, text in zip(batch, generated_texts):
+                results[i] = text
         
-        return generated_text
+        elapsed = time.perf_counter() - started
+        logger.info(f"TrOCR recognized {len(crops)} lines in {elapsed:.2f}s ({len(crops) / max(elapsed, 1e-6):.1f} lines/s)")
+        return results
     
     def _process_with_tesseract(self, image: Image.Image) -> str:
         """Process image with Tesseract OCR."""
         # Ensure image is in a format Tesseract can handle
-        if image.mode != "RGB":
+        if image.mode not in ("RGB", "L"):
             image = image.convert("RGB")
         
         # Extract text using Tesseract
-        text = pytesseract.image_to_string(image)
+        text = self.tesseract.image_to_string(image)
         return text
     
     def process_base64_image(self, base64_string: str) -> str:
@@ -0,0 +1,117 @@
+import threading
+import logging
+from typing import Dict, List
+
+import fitz  # PyMuPDF for PDF handling
+
+logger = logging.getLogger(__name__)
+
+
+def image_regions_without_text(page: "fitz.Page", min_area_ratio: float = 0.02,
+                               contained_share: float = 0.5) -> List["fitz.Rect"]:
+    """
+    Find image blocks on a page that carry no text layer of their own.
+
+    Figures, scanned inserts and diagram screenshots on otherwise digital pages
+    are invisible to page.get_text(); these are the regions that need OCR.
+    Regions are rendered with everything drawn over them, so an image with any
+    text block on it (a letterhead or page background under the text layer)
+    is skipped, however sparse the text: OCR would repeat that text.
+
+    Args:
+        page: PDF page
+        min_area_ratio: Images smaller than this share of the page (logos, icons) are ignored
+        contained_share: A text block counts as on the image when this share of its area lies inside it
+
+    Returns:
+        Regions in reading order (top-to-bottom, left-to-right)
+    """
+    page_rect = page.rect
+    page_area = abs(page_rect)
+    if page_area == 0:
+        return []
+
+    text_rects = [fitz.Rect(block[:4]) for block in page.get_text("blocks") if block[6] == 0]
+    regions = []
+    for info in page.get_image_info():
+        rect = fitz.Rect(info["bbox"]) & page_rect
+        area = abs(rect)
+        if rect.is_empty or area < min_area_ratio * page_area:
+            continue
+        if any(abs(rect & text_rect) > contained_share * abs(text_rect) for text_rect in text_rects):
+            continue
+        regions.append(rect)
+
+    regions.sort(key=lambda r: (r.y0, r.x0))
+    return regions
+
+
+class BackendPlanner:
+    """
+    Chooses the OCR backend per image from measured throughput.
+
+    TrOCR cost grows with the number of text lines, Tesseract cost with the
+    image area. Both rates are tracked as exponential moving averages of real
+    runs, so dense pages go to Tesseract and sparse ones to TrOCR at whatever
+    crossover the current hardware produces.
+    """
+
+    def __init__(self, trocr_seconds_per_line: float = 0.3, tesseract_seconds_per_mpix: float = 0.8,
+                 smoothing: float = 0.2):
+        """
+        Args:
+            trocr_seconds_per_line: Initial estimate of TrOCR time per text line
+            tesseract_seconds_per_mpix: Initial estimate of Tesseract time per megapixel
+            smoothing: Weight of each new measurement in the moving averages
+        """
+        self._lock = threading.Lock()
+        self._rates: Dict[str, float] = {
+            "trocr": trocr_seconds_per_line,
+            "tesseract": tesseract_seconds_per_mpix,
+        }
+        self._runs: Dict[str, int] = {"trocr": 0, "tesseract": 0}
+        self.smoothing = smoothing
+
+    def choose(self, lines: int, megapixels: float, trocr: bool = True, tesseract: bool = True) -> str:
+        """
+        Pick the backend with the lower expected time for an image.
+
+        Args:
+            lines: Number of text lines found by segmentation
+            megapixels: Image area in megapixels
+            trocr: Whether TrOCR is available
+            tesseract: Whether Tesseract is available
+
+        Returns:
+            'trocr', 'tesseract' or 'none'
+        """
+        if not (trocr and tesseract):
+            return "trocr" if trocr else "tesseract" if tesseract else "none"
+        with self._lock:
+            trocr_cost = lines * self._rates["trocr"]
+            tesseract_cost = megapixels * self._rates["tesseract"]
+        return "trocr" if trocr_cost <= tesseract_cost else "tesseract"
+
+    def record(self, backend: str, units: float, seconds: float) -> None:
+        """
+        Update the throughput estimate of a backend.
+
+        Args:
+            backend: 'trocr' (units are lines) or 'tesseract' (units are megapixels)
+            units: Amount of work processed
+            seconds: Wall time it took
+        """
+        if units <= 0:
+            return
+        with self._lock:
+            rate = seconds / units
+            self._rates[backend] += self.smoothing * (rate - self._rates[backend])
+            self._runs[backend] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return the current throughput estimates."""
+        with self._lock:
+            return {
+                "trocr": {"seconds_per_line": round(self._rates["trocr"], 4), "runs": self._runs["trocr"]},
+                "tesseract": {"seconds_per_megapixel": round(self._rates["tesseract"], 4), "runs": self._runs["tesseract"]},
+            }
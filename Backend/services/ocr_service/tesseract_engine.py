@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+from PIL import Image
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:  # optional in-process binding
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+
+class TesseractEngine:
+    """
+    Tesseract backend that keeps a bounded pool of initialized engines.
+
+    With tesserocr installed, recognition runs in-process through the Tesseract
+    C++ API: language data is loaded once per engine and images are passed as
+    memory buffers. Engines are checked out for one call and returned, so their
+    number follows the peak number of concurrent calls (at most max_engines),
+    not the number of threads that ever called. Without tesserocr (or if the
+    in-process call fails), pytesseract is used, which spawns a tesseract
+    process per image.
+    """
+
+    def __init__(self, lang: str = "eng", tessdata_path: Optional[str] = None,
+                 max_engines: Optional[int] = None):
+        """
+        Initialize the engine and check that Tesseract is usable.
+
+        Args:
+            lang: Tesseract language(s), e.g. 'eng' or 'eng+rus'
+            tessdata_path: Directory with traineddata files (optional)
+            max_engines: Most in-process engines kept; further calls wait for one (default: CPU count)
+
+        Raises:
+            Exception: If neither the in-process binding nor the tesseract binary works
+        """
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self.max_engines = max(1, max_engines or os.cpu_count() or 1)
+        self._idle: "queue.LifoQueue[tesserocr.PyTessBaseAPI]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._apis: List["tesserocr.PyTessBaseAPI"] = []
+        self._created = 0
+        self.in_process = False
+
+        if tesserocr is not None:
+            try:
+                self._created = 1
+                self._idle.put(self._create_api())
+                self.in_process = True
+            except Exception as e:
+                logger.warning(f"In-process Tesseract unavailable, using pytesseract: {str(e)}")
+
+        if not self.in_process:
+            # Quick test to see if the Tesseract binary is available
+            pytesseract.get_tesseract_version()
+
+    @property
+    def mode(self) -> str:
+        return "tesserocr" if self.in_process else "pytesseract"
+
+    def _create_api(self) -> "tesserocr.PyTessBaseAPI":
+        kwargs = {"lang": self.lang}
+        if self.tessdata_path:
+            kwargs["path"] = self.tessdata_path
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        with self._lock:
+            self._apis.append(api)
+        return api
+
+    @contextmanager
+    def _api(self) -> Iterator["tesserocr.PyTessBaseAPI"]:
+        """Check out an idle engine, creating one while fewer than max_engines exist."""
+        try:
+            api = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.max_engines
+                if create:
+                    self._created += 1
+            if not create:
+                api = self._idle.get()
+            else:
+                try:
+                    api = self._create_api()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+        try:
+            yield api
+        finally:
+            self._idle.put(api)
+
+    def image_to_string(self, image: Union[Image.Image, np.ndarray]) -> str:
+        """
+        Recognize text in an image.
+
+        Args:
+            image: PIL Image or NumPy array (grayscale or RGB)
+
+        Returns:
+            Extracted text
+        """
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+
+        if self.in_process:
+            try:
+                with self._api() as api:
+                    api.SetImage(image)
+                    return api.GetUTF8Text()
+            except Exception as e:
+                logger.warning(f"In-process Tesseract failed, falling back to pytesseract: {str(e)}")
+
+        return pytesseract.image_to_string(image, lang=self.lang)
+
+    def close(self) -> None:
+        """Release all engines."""
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis.clear()
+            self._created = 0
+            self._idle = queue.LifoQueue()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import logging
+
+try:
+    from optimum.onnxruntime import ORTModelForVision2Seq
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+except ImportError:  # optional ONNX Runtime backend
+    ORTModelForVision2Seq = None
+
+logger = logging.getLogger(__name__)
+
+# Files written by the optimum exporter for an encoder-decoder model with KV cache
+ONNX_PARTS = ("encoder_model", "decoder_model", "decoder_with_past_model")
+
+
+def _export(model_id: str, export_dir: str) -> None:
+    """Export the TrOCR encoder and decoders to ONNX once."""
+    logger.info(f"Exporting {model_id} to ONNX in {export_dir}...")
+    model = ORTModelForVision2Seq.from_pretrained(model_id, export=True, use_cache=True)
+    model.save_pretrained(export_dir)
+
+
+def _quantize(export_dir: str, quantized_dir: str) -> None:
+    """Write int8 dynamically quantized copies of the exported ONNX files."""
+    logger.info(f"Quantizing ONNX TrOCR to int8 in {quantized_dir}...")
+    os.makedirs(quantized_dir, exist_ok=True)
+    for name in os.listdir(export_dir):
+        source = os.path.join(export_dir, name)
+        if name.endswith(".onnx"):
+            quantize_dynamic(source, os.path.join(quantized_dir, name), weight_type=QuantType.QInt8)
+        elif os.path.isfile(source):
+            # configs, generation config, external weight data
+            shutil.copy2(source, os.path.join(quantized_dir, name))
+
+
+def load_onnx_trocr(model_id: str, cache_dir: str, quantize: bool = True) -> "ORTModelForVision2Seq":
+    """
+    Load TrOCR for ONNX Runtime, exporting and quantizing it on first use.
+
+    The exported (and int8) models are kept under cache_dir, so later starts
+    only load the ONNX files. Decoding uses the decoder-with-past graph, i.e.
+    cached keys/values instead of re-running the decoder over the whole prefix.
+
+    Args:
+        model_id: Hugging Face model id of the TrOCR checkpoint
+        cache_dir: Directory where exported models are stored
+        quantize: Use int8 weights (dynamic quantization)
+
+    Returns:
+        Model with the same generate() interface as VisionEncoderDecoderModel
+    """
+    if ORTModelForVision2Seq is None:
+        raise ImportError("optimum[onnxruntime] is required for the ONNX TrOCR backend")
+
+    export_dir = os.path.join(cache_dir, model_id.replace("/", "--"))
+    if not all(os.path.exists(os.path.join(export_dir, f"{part}.onnx")) for part in ONNX_PARTS):
+        _export(model_id, export_dir)
+
+    model_dir = export_dir
+    if quantize:
+        model_dir = f"{export_dir}-int8"
+        if not all(os.path.exists(os.path.join(model_dir, f"{part}.onnx")) for part in ONNX_PARTS):
+            _quantize(export_dir, model_dir)
+
+    model = ORTModelForVision2Seq.from_pretrained(model_dir, use_cache=True, provider="CPUExecutionProvider")
+    logger.info(f"ONNX TrOCR model loaded from {model_dir}")
+    return model
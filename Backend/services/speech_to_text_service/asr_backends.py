@@ -0,0 +1,186 @@
+"""
+Speech recognition backends behind a common interface.
+
+ASR_BACKEND selects the implementation:
+    transformers  Hugging Face pipeline (the original setup; float16 on GPU, float32 on CPU)
+    ctranslate2   faster-whisper on CTranslate2 with int8 weights, loaded from local files
+    stub          no model; canned transcripts, for load-testing transport and scheduling
+
+The CTranslate2 model is converted once, e.g.:
+    ct2-transformers-converter --model openai/whisper-large-v3-turbo \
+        --output_dir models/whisper-large-v3-turbo-ct2 --quantization int8
+"""
+import itertools
+import logging
+from abc import ABC, abstractmethod
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+
+SAMPLE_RATE = 16000
+LANGUAGE = "ru"
+
+
+class ASRBackend(ABC):
+    """
+    Transcribes batches of float32 16 kHz mono clips.
+
+    transcribe_batch() returns one transcript per clip, or with
+    word_timestamps one list of (word, start_seconds, end_seconds) per clip.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.rtf = None
+
+    @abstractmethod
+    def transcribe_batch(self, segments, word_timestamps=False):
+        """
+        Args:
+            segments: Sequence of float32 16 kHz mono clips
+            word_timestamps: Return (word, start, end) lists instead of text
+
+        Returns:
+            One result per clip, in order
+        """
+
+    def warmup(self, seconds=5.0):
+        """
+        Run a synthetic clip through the model and measure the real-time factor.
+
+        Returns:
+            Processing time divided by audio duration (below 1 is faster than real time)
+        """
+        rng = np.random.default_rng(0)
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        clip = (0.1 * np.sin(2 * np.pi * 220 * t) + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+        # The first call pays for lazy initialization; time the second one
+        self.transcribe_batch([clip[:SAMPLE_RATE]])
+        started = time.perf_counter()
+        self.transcribe_batch([clip])
+        self.rtf = (time.perf_counter() - started) / seconds
+        logging.info(f"ASR backend '{self.name}': RTF {self.rtf:.3f} on a {seconds:.1f} s warmup clip")
+        return self.rtf
+
+
+class TransformersBackend(ASRBackend):
+    """Whisper through the transformers automatic-speech-recognition pipeline."""
+
+    name = "transformers"
+
+    def __init__(self, pipe=None):
+        super().__init__()
+        if pipe is None:
+            from baseline_pipeline import get_pipeline
+            pipe = get_pipeline()
+        self.pipe = pipe
+
+    def transcribe_batch(self, segments, word_timestamps=False):
+        kwargs = {"return_timestamps": "word"} if word_timestamps else {}
+        outputs = self.pipe(list(segments), batch_size=len(segments), generate_kwargs={
+            "language": LANGUAGE,
+            "task": "transcribe"
+        }, **kwargs)
+        if not word_timestamps:
+            return [output["text"].strip() for output in outputs]
+        return [
+            [(chunk["text"].strip(), chunk["timestamp"][0], chunk["timestamp"][1]) for chunk in output.get("chunks", [])]
+            for output in outputs
+        ]
+
+
+class CTranslate2Backend(ASRBackend):
+    """
+    Whisper on CTranslate2 (faster-whisper) with int8 weights.
+
+    CTranslate2 has no padded batch API for independent clips; instead the
+    model is created with several workers and the clips of a batch are
+    transcribed concurrently.
+    """
+
+    name = "ctranslate2"
+
+    def __init__(self, model_path, device="auto", compute_type="int8", num_workers=2, cpu_threads=0,
+                 beam_size=1):
+        """
+        Args:
+            model_path: Directory with the converted CTranslate2 model
+            device: 'cpu', 'cuda' or 'auto'
+            compute_type: CTranslate2 quantization, e.g. 'int8', 'int8_float16', 'float16'
+            num_workers: Clips transcribed in parallel
+            cpu_threads: Threads per worker (0 lets CTranslate2 decide)
+            beam_size: Decoding beam size (1 is greedy, like the transformers pipeline)
+        """
+        super().__init__()
+        if not FASTER_WHISPER_AVAILABLE:
+            raise ImportError("faster-whisper is not installed")
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"CTranslate2 model not found at {model_path}")
+        self.model = WhisperModel(model_path, device=device, compute_type=compute_type,
+                                  num_workers=num_workers, cpu_threads=cpu_threads, local_files_only=True)
+        self.beam_size = beam_size
+        self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="ct2")
+
+    def _transcribe(self, audio, word_timestamps):
+        segments, _ = self.model.transcribe(audio, language=LANGUAGE, task="transcribe", beam_size=self.beam_size,
+                                            word_timestamps=word_timestamps, condition_on_previous_text=False)
+        if not word_timestamps:
+            return "".join(segment.text for segment in segments).strip()
+        return [(word.word.strip(), word.start, word.end) for segment in segments for word in segment.words or []]
+
+    def transcribe_batch(self, segments, word_timestamps=False):
+        return list(self._executor.map(lambda audio: self._transcribe(audio, word_timestamps), segments))
+
+
+class StubBackend(ASRBackend):
+    """
+    Returns a numbered placeholder transcript per clip without running a model.
+
+    Optionally sleeps rtf times the batch's audio duration to stand in for
+    inference cost. Numbering keeps consecutive results distinct, so the
+    server's duplicate filter doesn't swallow them.
+    """
+
+    name = "stub"
+
+    def __init__(self, rtf=0.0):
+        super().__init__()
+        self.stub_rtf = rtf
+        self._counter = itertools.count(1)
+
+    def transcribe_batch(self, segments, word_timestamps=False):
+        durations = [len(audio) / SAMPLE_RATE for audio in segments]
+        if self.stub_rtf:
+            time.sleep(self.stub_rtf * sum(durations))
+        texts = [f"segment {next(self._counter)}" for _ in segments]
+        if not word_timestamps:
+            return texts
+        return [[(text, 0.0, duration)] for text, duration in zip(texts, durations)]
+
+
+def create_backend(name=None):
+    """Build the backend selected by ASR_BACKEND (default 'transformers')."""
+    name = name or os.getenv("ASR_BACKEND", "transformers")
+    if name == "transformers":
+        return TransformersBackend()
+    if name == "ctranslate2":
+        return CTranslate2Backend(
+            os.getenv("ASR_CT2_MODEL_PATH", "models/whisper-large-v3-turbo-ct2"),
+            device=os.getenv("ASR_CT2_DEVICE", "auto"),
+            compute_type=os.getenv("ASR_CT2_COMPUTE_TYPE", "int8"),
+            num_workers=int(os.getenv("ASR_CT2_WORKERS", "2")),
+            cpu_threads=int(os.getenv("ASR_CT2_CPU_THREADS", "0")),
+        )
+    if name == "stub":
+        return StubBackend(rtf=float(os.getenv("ASR_STUB_RTF", "0")))
+    raise ValueError(f"Unknown ASR backend: {name}")
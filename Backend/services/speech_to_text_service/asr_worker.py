@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+from metrics import log_event
+
+
+class Segment:
+    """
+    Audio waiting for recognition.
+
+    kind is 'utterance' (plain transcript), 'chunk' (a window of a long
+    utterance, with word timestamps), 'window' (streaming re-decode with word
+    timestamps; a newer window replaces a pending one) or 'final' (the last
+    window of a streamed utterance). context is returned with the result.
+    """
+
+    def __init__(self, audio, kind="utterance", context=None):
+        self.audio = audio
+        self.kind = kind
+        self.context = context
+        self.queued_at = time.monotonic()
+        # Filled in by the worker when the segment has been recognized
+        self.wait_ms = None
+        self.inference_ms = None
+        self.rtf = None
+
+    @property
+    def word_timestamps(self):
+        return self.kind != "utterance"
+
+
+class ASRSession:
+    """
+    One WebSocket connection as seen by the ASR worker.
+
+    Finished utterances wait in a bounded backlog; (segment, result) pairs
+    come back on an asyncio queue owned by the connection's event loop.
+    """
+
+    def __init__(self, loop, max_backlog, max_segment_samples, session_id=None):
+        self.id = session_id or uuid.uuid4().hex
+        self.loop = loop
+        self.results = asyncio.Queue()
+        self.pending = deque()
+        self.max_backlog = max_backlog
+        self.max_segment_samples = max_segment_samples
+        self.closed = False
+        self.submitted = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def deliver(self, segment, result):
+        if self.closed:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.results.put_nowait, (segment, result))
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+
+class ASRWorker:
+    """
+    Runs speech recognition on a dedicated thread so the event loop keeps
+    reading audio from every connection while a model call is in progress.
+
+    Segments are micro-batched: once one is ready the worker keeps gathering
+    from other sessions for up to max_wait_ms or until max_batch_size is
+    reached, then runs a single batched model call and routes each transcript
+    back to its session. Sessions are gathered round-robin, one segment at a
+    time, so one busy speaker can't starve the others. When a session's
+    backlog is full the new segment is merged into the newest pending one,
+    or, if that would exceed the segment limit, the oldest one is dropped.
+    """
+
+    def __init__(self, transcribe_batch, max_batch_size=8, max_wait_ms=50, max_backlog=3,
+                 max_segment_samples=30 * 16000):
+        """
+        Args:
+            transcribe_batch: Callable taking a list of float32 16 kHz clips and word_timestamps, and
+                returning their transcripts (or lists of (word, start, end) with word_timestamps)
+            max_batch_size: Most segments per model call
+            max_wait_ms: How long a ready segment may wait for others to join its batch
+            max_backlog: Pending segments allowed per session
+            max_segment_samples: Longest segment a merge may produce
+        """
+        self._transcribe_batch = transcribe_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_backlog = max_backlog
+        self.max_segment_samples = max_segment_samples
+        self._cond = threading.Condition()
+        self._ready = deque()
+        self._sessions = {}
+        self._stopped = False
+        self._thread = None
+        self._batches = 0
+        self._batched_segments = 0
+        self._wait_ms_total = 0.0
+        self._compute_ms_total = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="asr-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def open_session(self, loop=None, session_id=None, max_backlog=None):
+        session = ASRSession(loop or asyncio.get_running_loop(), max_backlog or self.max_backlog,
+                             self.max_segment_samples, session_id)
+        with self._cond:
+            self._sessions[session.id] = session
+        return session
+
+    def close_session(self, session):
+        with self._cond:
+            session.closed = True
+            session.pending.clear()
+            self._sessions.pop(session.id, None)
+            if session in self._ready:
+                self._ready.remove(session)
+
+    def submit(self, session, audio, kind="utterance", context=None):
+        """
+        Queue audio for recognition.
+
+        The audio is copied, so the caller may reuse its buffer right away.
+        """
+        audio = np.array(audio, dtype=np.float32)
+        with self._cond:
+            if session.closed:
+                return
+            session.submitted += 1
+            # A newer window of the same stream supersedes a pending one, but only
+            # at the tail: a window queued ahead of a final belongs to an earlier
+            # utterance, and jumping ahead of it would feed this utterance's audio
+            # into that utterance's agreement state
+            if kind == "window" and session.pending and session.pending[-1].kind == "window":
+                newest = session.pending[-1]
+                newest.audio, newest.context = audio, context
+                session.merged += 1
+                return
+            if len(session.pending) >= session.max_backlog:
+                newest = session.pending[-1]
+                if (kind == newest.kind == "utterance" and
+                        len(newest.audio) + len(audio) <= session.max_segment_samples):
+                    newest.audio = np.concatenate([newest.audio, audio])
+                    session.merged += 1
+                    logging.warning(f"Session {session.id} backlog full, merged segment")
+                    return
+                session.pending.popleft()
+                session.dropped += 1
+                logging.warning(f"Session {session.id} backlog full, dropped oldest segment")
+
+            was_idle = not session.pending
+            session.pending.append(Segment(audio, kind, context))
+            if was_idle:
+                self._ready.append(session)
+                self._cond.notify()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._ready and not self._stopped:
+                self._cond.wait()
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            batch = []
+            while not self._stopped:
+                while self._ready and len(batch) < self.max_batch_size:
+                    session = self._ready.popleft()
+                    batch.append((session, session.pending.popleft()))
+                    if session.pending:
+                        self._ready.append(session)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.max_batch_size or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            started = time.monotonic()
+            try:
+                results = self._transcribe(batch)
+            except Exception as e:
+                logging.error(f"ASR Error: {e}")
+                # Deliver None so consumers waiting on these segments don't hang
+                for session, segment in batch:
+                    session.deliver(segment, None)
+                continue
+            compute_ms = (time.monotonic() - started) * 1000
+            wait_ms = sum(started - segment.queued_at for _, segment in batch) * 1000
+
+            with self._cond:
+                self._batches += 1
+                self._batched_segments += len(batch)
+                self._wait_ms_total += wait_ms
+                self._compute_ms_total += compute_ms
+            audio_seconds = sum(len(segment.audio) for _, segment in batch) / 16000
+            rtf = compute_ms / 1000 / max(audio_seconds, 1e-6)
+            log_event("asr_batch", sample_every=10, size=len(batch), max_size=self.max_batch_size,
+                      compute_ms=round(compute_ms), mean_wait_ms=round(wait_ms / len(batch)), rtf=round(rtf, 3))
+
+            for (session, segment), result in zip(batch, results):
+                segment.wait_ms = (started - segment.queued_at) * 1000
+                segment.inference_ms = compute_ms
+                segment.rtf = rtf
+                session.deliver(segment, result)
+
+    def _transcribe(self, batch):
+        """Run one model call per output type, results in batch order."""
+        # Empty audio (e.g. a streaming window already fully committed) needs no model call
+        results = [[] if segment.word_timestamps else "" for _, segment in batch]
+        for word_timestamps in (False, True):
+            # Similar lengths side by side keep padding inside the batch small
+            order = sorted((i for i, (_, segment) in enumerate(batch)
+                            if segment.word_timestamps == word_timestamps and len(segment.audio)),
+                           key=lambda i: len(batch[i][1].audio))
+            if not order:
+                continue
+            outputs = self._transcribe_batch([batch[i][1].audio for i in order], word_timestamps=word_timestamps)
+            for i, output in zip(order, outputs):
+                results[i] = output
+        return results
+
+    def stats(self):
+        with self._cond:
+            return {
+                "sessions": len(self._sessions),
+                "pending_segments": sum(len(s.pending) for s in self._sessions.values()),
+                "merged_segments": sum(s.merged for s in self._sessions.values()),
+                "dropped_segments": sum(s.dropped for s in self._sessions.values()),
+                "batches": self._batches,
+                "max_batch_size": self.max_batch_size,
+                "mean_batch_size": round(self._batched_segments / max(self._batches, 1), 2),
+                "batch_occupancy": round(self._batched_segments / max(self._batches * self.max_batch_size, 1), 3),
+                "mean_queue_wait_ms": round(self._wait_ms_total / max(self._batched_segments, 1), 1),
+                "mean_batch_compute_ms": round(self._compute_ms_total / max(self._batches, 1), 1),
+            }
@@ -0,0 +1,68 @@
+import numpy as np
+
+try:
+    import opuslib
+    OPUS_AVAILABLE = True
+except ImportError:
+    OPUS_AVAILABLE = False
+
+
+class PCMDecoder:
+    """Raw little-endian int16 mono PCM at the client's sample rate."""
+
+    codec = "pcm"
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def decode(self, data):
+        if len(data) < 2:
+            return np.empty(0, dtype=np.float32)
+        # An odd trailing byte can't be a sample
+        samples = np.frombuffer(data, dtype=np.int16, count=len(data) // 2)
+        return samples.astype(np.float32) / 32768.0
+
+
+class OpusDecoder:
+    """
+    One raw Opus packet per WebSocket message (e.g. from the browser's
+    WebCodecs AudioEncoder), mono.
+
+    Opus can decode to any of its supported rates whatever the encoder ran
+    at, so packets are decoded straight to 16 kHz and the resampler is a
+    no-op. Voice at 24-32 kbit/s is 3-4 KB/s against 96 KB/s for 48 kHz PCM.
+    """
+
+    codec = "opus"
+    # Longest Opus frame is 120 ms
+    MAX_FRAME_MS = 120
+
+    def __init__(self, sample_rate=16000):
+        if not OPUS_AVAILABLE:
+            raise ImportError("opuslib is not installed")
+        self.sample_rate = sample_rate
+        self._decoder = opuslib.Decoder(sample_rate, 1)
+        self._max_frame = sample_rate * self.MAX_FRAME_MS // 1000
+
+    def decode(self, packet):
+        if not packet:
+            return np.empty(0, dtype=np.float32)
+        pcm = self._decoder.decode(bytes(packet), self._max_frame)
+        return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def available_codecs():
+    """Codecs the server can decode, in order of preference."""
+    return ["opus", "pcm"] if OPUS_AVAILABLE else ["pcm"]
+
+
+def create_decoder(codec, sample_rate, target_rate=16000):
+    """
+    Args:
+        codec: 'pcm' or 'opus'
+        sample_rate: Client sample rate (PCM only; Opus decodes to target_rate)
+        target_rate: Rate the ASR pipeline runs at
+    """
+    if codec == "opus":
+        return OpusDecoder(target_rate)
+    return PCMDecoder(sample_rate)
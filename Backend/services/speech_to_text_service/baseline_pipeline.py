@@ -1,33 +1,46 @@
 import logging
 
-import numpy as np
 import queue
 import threading
 import time
 from transformers import pipeline
-from download_and_initialize_model import load_model, global_model
-if global_model is None:
-    global_model = load_model()
-model = global_model["model"]
-processor = global_model["processor"]
-device = global_model["device"]
-torch_dtype = global_model["torch_dtype"]
+from ring_buffer import AudioRingBuffer
+from vad import SpeechSegmenter
+from download_and_initialize_model import load_model
+
 logging.basicConfig(level=logging.DEBUG)
 
-if hasattr(model.config, "forced_decoder_ids"):
-    model.config.forced_decoder_ids = None
-
-pipe = pipeline(
-    "automatic-speech-recognition",
-    model=model,
-    tokenizer=processor.tokenizer,
-    feature_extractor=processor.feature_extractor,
-    torch_dtype=torch_dtype,
-    device=device,
-)
+_pipe = None
+_pipe_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Load the Whisper model and build the ASR pipeline on first use."""
+    global _pipe
+    with _pipe_lock:
+        if _pipe is None:
+            global_model = load_model()
+            model = global_model["model"]
+            processor = global_model["processor"]
+
+            if hasattr(model.config, "forced_decoder_ids"):
+                model.config.forced_decoder_ids = None
+
+            _pipe = pipeline(
+                "automatic-speech-recognition",
+                model=model,
+                tokenizer=processor.tokenizer,
+                feature_extractor=processor.feature_extractor,
+                torch_dtype=global_model["torch_dtype"],
+                device=global_model["device"],
+            )
+    return _pipe
+
+
 sample_rate = 16000
 block_duration = 0.5
 block_size = int(sample_rate * block_duration)
+max_buffer_duration = 30
 audio_q = queue.Queue()
 recognized_q = queue.Queue()
 def audio_callback(indata, frames, time_info, status):
@@ -36,10 +49,10 @@ def audio_callback(indata, frames, time_info, status):
     audio_q.put(indata.copy())
 
 
-def process_audio():
-    buffer = np.empty((0, 1), dtype=np.float32)
+def process_audio(pipe):
+    buffer = AudioRingBuffer(sample_rate * max_buffer_duration)
+    segmenter = SpeechSegmenter(sample_rate=sample_rate)
     prev_result = None
-    silence_duration = 0
 
     while True:
         try:
@@ -51,21 +64,20 @@ def process_audio():
                 while not audio_q.empty():
                     audio_q.get()
 
-            buffer = np.concatenate((buffer, data))
-
-            if np.max(np.abs(data)) < 0.005:
-                silence_duration += len(data) / sample_rate
-                if silence_duration > 2.0:
-                    buffer = np.empty((0, 1), dtype=np.float32)
-                    silence_duration = 0
-            else:
-                silence_duration = 0
+            # Only speech reaches the buffer; a finished utterance flushes its tail
+            utterance_ended = False
+            for event, audio in segmenter.push(data):
+                if event == "speech":
+                    buffer.append(audio)
+                elif event == "end":
+                    utterance_ended = True
+                else:
+                    buffer.clear()
 
-            if len(buffer) >= block_size:
+            while len(buffer) >= block_size or (utterance_ended and len(buffer)):
+                count = min(len(buffer), block_size)
                 try:
-                    audio_chunk = buffer[:block_size]
-                    buffer = buffer[block_size:]
-                    audio_input = audio_chunk.flatten()
+                    audio_input = buffer.view()[:count]
                     result = pipe(audio_input, generate_kwargs={
                         "language": "ru",
                         "task": "transcribe"
@@ -76,16 +88,20 @@ def process_audio():
                         prev_result = result
                 except Exception as e:
                     logging.error(f"Error processing audio: {e}")
+                finally:
+                    buffer.consume(count)
 
         except queue.Empty:
             continue
         except Exception as e:
             logging.error(f"Unexpected error: {e}")
             continue
-processing_thread = threading.Thread(target=process_audio, daemon=True)
-processing_thread.start()
+
+
 if __name__ == "__main__":
     import sounddevice as sd
+    processing_thread = threading.Thread(target=process_audio, args=(get_pipeline(),), daemon=True)
+    processing_thread.start()
     with sd.InputStream(callback=audio_callback, channels=1, samplerate=sample_rate):
         try:
             while True:
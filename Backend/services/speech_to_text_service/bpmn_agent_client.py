@@ -0,0 +1,28 @@
+"""
+In-process access to the BPMN agent service (Backend/services/bpmn_agent_service).
+
+Only its plain modules are imported (the LLM client, BPMN generation), never
+the FastAPI router, so the speech service doesn't depend on FastAPI.
+"""
+import importlib
+import os
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def _import(module):
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return importlib.import_module(f"services.bpmn_agent_service.{module}")
+
+
+def load_llm():
+    """call_deepseek_api, which already handles the external and local API modes."""
+    return _import("api").call_deepseek_api
+
+
+def load_bpmn_generator():
+    """generate_bpmn_xml and is_complete_bpmn_xml, the generation /api/bpmn/process_bpmn runs."""
+    generation = _import("generation")
+    return generation.generate_bpmn_xml, generation.is_complete_bpmn_xml
@@ -0,0 +1,86 @@
+import math
+
+from ring_buffer import AudioRingBuffer
+
+
+class UtteranceChunker:
+    """
+    Splits long speech into overlapping fixed-size windows.
+
+    Once the window fills while someone is still talking it is handed off
+    for recognition right away, and only the overlap is kept for the next
+    window, so memory and latency stay flat however long the utterance is.
+    Each window carries the absolute range of audio it is responsible for:
+    the overlap is split at its midpoint, and merge() keeps the words whose
+    timestamps fall on this window's side of the cut.
+    """
+
+    def __init__(self, sample_rate=16000, window_seconds=30, overlap_seconds=5):
+        self.sample_rate = sample_rate
+        self.window = int(window_seconds * sample_rate)
+        self.overlap = int(overlap_seconds * sample_rate)
+        self.buffer = AudioRingBuffer(self.window)
+        self.buffer_start = 0  # absolute index of the first buffered sample
+        self._lower = None     # cut point left by the previous window of this utterance
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def append(self, audio, submit):
+        """
+        Add speech, calling submit(audio, kind, context) for every window that fills.
+
+        The audio passed to submit is only valid during the call.
+        """
+        while len(audio):
+            space = self.window - len(self.buffer)
+            self.buffer.append(audio[:space])
+            audio = audio[space:]
+            if len(self.buffer) < self.window:
+                break
+            cut = self.buffer_start + self.window - self.overlap // 2
+            submit(self.buffer.view(), "chunk", (self.buffer_start, self._bound(self._lower), cut))
+            self._lower = cut
+            self.buffer.consume(self.window - self.overlap)
+            self.buffer_start += self.window - self.overlap
+
+    def finish(self, submit):
+        """
+        End the utterance and submit what is left.
+
+        An utterance that fit in a single window goes as a plain 'utterance'
+        segment; the tail of a split one as the last 'chunk'.
+        """
+        if self._lower is None:
+            if len(self.buffer):
+                submit(self.buffer.view(), "utterance", None)
+        else:
+            submit(self.buffer.view(), "chunk", (self.buffer_start, self._lower, math.inf))
+        self.discard()
+
+    def discard(self):
+        self.buffer_start += len(self.buffer)
+        self.buffer.clear()
+        self._lower = None
+
+    @staticmethod
+    def _bound(value):
+        return -math.inf if value is None else value
+
+    def merge(self, words, context):
+        """
+        Text of a window's words that fall inside its own range.
+
+        Args:
+            words: (word, start_seconds, end_seconds) relative to the window
+            context: (window start, lower cut, upper cut) in absolute samples
+        """
+        start, lower, upper = context
+        kept = []
+        for text, word_start, word_end in words:
+            if word_end is None:
+                word_end = word_start
+            middle = start + (word_start + word_end) / 2 * self.sample_rate
+            if lower <= middle < upper:
+                kept.append(text)
+        return " ".join(word for word in kept if word).strip()
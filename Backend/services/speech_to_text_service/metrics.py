@@ -0,0 +1,199 @@
+import json
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger("speech.metrics")
+
+
+class LatencyStats:
+    """Count, mean and max over all values, percentiles over the most recent window."""
+
+    def __init__(self, window=1000):
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.recent.append(value)
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self, digits=1):
+        if not self.count:
+            return {"count": 0}
+        ordered = sorted(self.recent)
+
+        def percentile(q):
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], digits)
+
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, digits),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": round(self.max, digits),
+        }
+
+
+class SessionMetrics:
+    def __init__(self, session_id, mode, sample_rate, codec="pcm"):
+        self.session_id = session_id
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.codec = codec
+        self.opened_at = time.time()
+        self.frames = 0
+        self.bytes = 0
+        self.audio_seconds = 0.0
+        self.buffered_seconds = 0.0
+        self.vad_frames = 0
+        self.vad_speech_frames = 0
+        self.utterances = 0
+        self.cancelled_utterances = 0
+        self.segments_submitted = 0
+        self.results_sent = 0
+        self.queue_wait_ms = LatencyStats(200)
+        self.inference_ms = LatencyStats(200)
+        self.end_to_text_ms = LatencyStats(200)
+
+    def to_dict(self):
+        return {
+            "mode": self.mode,
+            "codec": self.codec,
+            "sample_rate": self.sample_rate,
+            "uptime_seconds": round(time.time() - self.opened_at, 1),
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "audio_seconds": round(self.audio_seconds, 2),
+            "ingress_kbps": round(self.bytes * 8 / 1000 / max(self.audio_seconds, 1e-6), 1),
+            "buffered_seconds": round(self.buffered_seconds, 2),
+            "vad": {
+                "frames": self.vad_frames,
+                "speech_frames": self.vad_speech_frames,
+                "speech_ratio": round(self.vad_speech_frames / max(self.vad_frames, 1), 3),
+                "utterances": self.utterances,
+                "cancelled_utterances": self.cancelled_utterances,
+            },
+            "segments_submitted": self.segments_submitted,
+            "results_sent": self.results_sent,
+            "queue_wait_ms": self.queue_wait_ms.to_dict(),
+            "inference_ms": self.inference_ms.to_dict(),
+            "end_of_speech_to_text_ms": self.end_to_text_ms.to_dict(),
+        }
+
+
+class Metrics:
+    """
+    Per-session and global speech service metrics.
+
+    Updated from the event loop thread only, so no locking is needed.
+    Closed sessions are folded into the global totals.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.sessions = {}
+        self.sessions_total = 0
+        self.frames = 0
+        self.audio_seconds = 0.0
+        self.segments_submitted = 0
+        self.results_sent = 0
+        self.queue_wait_ms = LatencyStats()
+        self.inference_ms = LatencyStats()
+        self.rtf = LatencyStats()
+        self.end_to_text_ms = LatencyStats()
+
+    def open_session(self, session_id, mode, sample_rate, codec="pcm"):
+        session = SessionMetrics(session_id, mode, sample_rate, codec)
+        self.sessions[session_id] = session
+        self.sessions_total += 1
+        return session
+
+    def close_session(self, session):
+        self.sessions.pop(session.session_id, None)
+        log_event("session_closed", session=session.session_id, frames=session.frames,
+                  audio_seconds=round(session.audio_seconds, 1), results=session.results_sent,
+                  end_to_text_ms=session.end_to_text_ms.to_dict())
+
+    def record_frame(self, session, n_bytes, n_samples, segmenter, buffered_samples):
+        """Account one binary WebSocket frame after it went through the VAD."""
+        seconds = n_samples / session.sample_rate
+        session.frames += 1
+        session.bytes += n_bytes
+        session.audio_seconds += seconds
+        session.buffered_seconds = buffered_samples / segmenter.sample_rate
+        session.vad_frames = segmenter.vad_frames
+        session.vad_speech_frames = segmenter.vad_speech_frames
+        session.utterances = segmenter.utterances
+        session.cancelled_utterances = segmenter.cancelled_utterances
+        self.frames += 1
+        self.audio_seconds += seconds
+        log_event("frames", sample_every=500, session=session.session_id, frames=session.frames,
+                  buffered_seconds=round(session.buffered_seconds, 2), speech_ratio=round(
+                      session.vad_speech_frames / max(session.vad_frames, 1), 3))
+
+    def record_submit(self, session):
+        session.segments_submitted += 1
+        self.segments_submitted += 1
+
+    def record_result(self, session, segment, sent):
+        """
+        Account a recognition result for a session.
+
+        End-of-speech-to-text latency runs from the moment the VAD closed the
+        segment (it is queued right then) until the message went out; the VAD
+        hangover before that is not included.
+        """
+        if segment.wait_ms is not None:
+            for stats in (session.queue_wait_ms, self.queue_wait_ms):
+                stats.add(segment.wait_ms)
+            for stats in (session.inference_ms, self.inference_ms):
+                stats.add(segment.inference_ms)
+            self.rtf.add(segment.rtf)
+        if not sent:
+            return
+        latency_ms = (time.monotonic() - segment.queued_at) * 1000
+        session.results_sent += 1
+        self.results_sent += 1
+        if segment.kind != "window":
+            session.end_to_text_ms.add(latency_ms)
+            self.end_to_text_ms.add(latency_ms)
+        log_event("result", sample_every=20, session=session.session_id, kind=segment.kind,
+                  queue_wait_ms=round(segment.wait_ms or 0), inference_ms=round(segment.inference_ms or 0),
+                  latency_ms=round(latency_ms))
+
+    def snapshot(self):
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "sessions_active": len(self.sessions),
+            "sessions_total": self.sessions_total,
+            "frames": self.frames,
+            "audio_seconds": round(self.audio_seconds, 1),
+            "segments_submitted": self.segments_submitted,
+            "results_sent": self.results_sent,
+            "queue_wait_ms": self.queue_wait_ms.to_dict(),
+            "inference_ms": self.inference_ms.to_dict(),
+            "real_time_factor": self.rtf.to_dict(digits=3),
+            "end_of_speech_to_text_ms": self.end_to_text_ms.to_dict(),
+        }
+
+
+_event_counts = {}
+
+
+def log_event(event, sample_every=1, **fields):
+    """
+    Log a structured (JSON) event, only every sample_every-th occurrence.
+
+    The number of occurrences since the last logged one is included as 'n'.
+    """
+    count = _event_counts.get(event, 0) + 1
+    if count < sample_every:
+        _event_counts[event] = count
+        return
+    _event_counts[event] = 0
+    logger.info(json.dumps({"event": event, "n": count, **fields}, ensure_ascii=False))
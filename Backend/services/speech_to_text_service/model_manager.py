@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+
+from asr_backends import create_backend
+
+
+class ModelManager:
+    """
+    Owns the ASR backend: loads it once, warms it up and reports readiness.
+
+    Loading happens in a background thread started with start(), or on the
+    first call to get() if nothing started it, so the server can accept
+    connections (and answer health checks) while the model is still loading.
+    """
+
+    def __init__(self, factory=create_backend, warmup=True):
+        self._factory = factory
+        self._warmup = warmup
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._thread = None
+        self.backend = None
+        self.state = "idle"  # idle -> loading -> ready | failed
+        self.error = None
+        self.load_seconds = None
+
+    def start(self):
+        """Begin loading in the background."""
+        with self._lock:
+            if self.state != "idle":
+                return
+            self.state = "loading"
+        self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            backend = self._factory()
+            if self._warmup:
+                backend.warmup()
+        except Exception as e:
+            logging.error(f"ASR model failed to load: {e}")
+            self.error = str(e)
+            self.state = "failed"
+        else:
+            self.backend = backend
+            self.load_seconds = time.perf_counter() - started
+            self.state = "ready"
+            logging.info(f"ASR model '{backend.name}' ready in {self.load_seconds:.1f} s")
+        finally:
+            self._loaded.set()
+
+    def get(self, timeout=None):
+        """
+        Return the loaded backend, loading it first if needed.
+
+        Raises:
+            RuntimeError: If loading failed or did not finish within timeout
+        """
+        with self._lock:
+            load_here = self.state == "idle"
+            if load_here:
+                self.state = "loading"
+        if load_here:
+            self._load()
+        if not self._loaded.wait(timeout):
+            raise RuntimeError("ASR model is still loading")
+        if self.backend is None:
+            raise RuntimeError(f"ASR model failed to load: {self.error}")
+        return self.backend
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def transcribe_batch(self, segments, word_timestamps=False):
+        return self.get().transcribe_batch(segments, word_timestamps=word_timestamps)
+
+    def status(self):
+        backend = self.backend
+        return {
+            "state": self.state,
+            "backend": backend.name if backend else None,
+            "rtf": round(backend.rtf, 3) if backend and backend.rtf is not None else None,
+            "load_seconds": round(self.load_seconds, 1) if self.load_seconds is not None else None,
+            "error": self.error,
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from chunking import UtteranceChunker
+from resampler import StreamingResampler
+from vad import SpeechSegmenter
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+SAMPLE_RATE = 16000
+# Frames read from the file per block (about 1.4 s at 48 kHz)
+DECODE_BLOCK_FRAMES = 65536
+
+
+def probe(path):
+    """
+    Read the header of an audio file.
+
+    Raises:
+        RuntimeError: If soundfile can't decode it (unsupported or corrupt file)
+    """
+    info = sf.info(path)
+    return {"sample_rate": info.samplerate, "channels": info.channels, "duration": info.duration,
+            "format": info.format}
+
+
+class OfflineTranscription:
+    """
+    Transcription of a recorded file through the shared ASR worker.
+
+    A decoder thread reads the file in blocks, downmixes and resamples them,
+    splits speech with the VAD (long utterances into overlapping windows)
+    and submits segments to the worker as it finds them, so they are batched
+    together with each other and with live sessions. The number of segments
+    in flight is bounded, which keeps memory flat for long recordings.
+    Results are yielded in file order with timestamps.
+    """
+
+    def __init__(self, worker, path, max_in_flight=16, window_seconds=30, overlap_seconds=5):
+        self.worker = worker
+        self.path = path
+        self.max_in_flight = max_in_flight
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.duration = 0.0
+        self._slots = threading.Semaphore(max_in_flight)
+        self._cancelled = threading.Event()
+        # (start seconds, end seconds) of every submitted segment, in order
+        self._submitted = deque()
+        self._chunker = None
+
+    def _decode(self, session):
+        info = sf.info(self.path)
+        resampler = StreamingResampler(info.samplerate, SAMPLE_RATE)
+        segmenter = SpeechSegmenter(sample_rate=SAMPLE_RATE)
+        chunker = self._chunker
+        # Where the current utterance starts in the file and in the chunker's timeline
+        file_start, chunker_start = 0, 0
+
+        def submit(audio, kind, context):
+            self._slots.acquire()
+            if kind == "chunk":
+                offset = file_start + context[0] - chunker_start
+                start, end = offset, offset + len(audio)
+            else:
+                start, end = file_start, file_start + len(audio)
+            self._submitted.append((start / SAMPLE_RATE, end / SAMPLE_RATE))
+            self.worker.submit(session, audio, kind=kind, context=context)
+
+        def handle(events):
+            nonlocal file_start, chunker_start
+            for event, audio in events:
+                if event == "speech":
+                    if not len(chunker):
+                        file_start, chunker_start = segmenter.utterance_start, chunker.buffer_start
+                    chunker.append(audio, submit)
+                elif event == "end":
+                    chunker.finish(submit)
+                else:
+                    chunker.discard()
+
+        for block in sf.blocks(self.path, blocksize=DECODE_BLOCK_FRAMES, dtype="float32", always_2d=True):
+            if self._cancelled.is_set():
+                return
+            mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+            handle(segmenter.push(resampler.process(mono)))
+        handle(segmenter.flush())
+        self.duration = segmenter.position / SAMPLE_RATE
+
+    async def segments(self, ignored=()):
+        """
+        Yield {"start", "end", "text"} for every transcribed segment, in file order.
+
+        Raises:
+            RuntimeError: If decoding the file fails
+        """
+        loop = asyncio.get_running_loop()
+        # Merges and drops are for live sessions; here the semaphore bounds the backlog
+        session = self.worker.open_session(loop, max_backlog=self.max_in_flight + 1)
+        self._chunker = UtteranceChunker(SAMPLE_RATE, self.window_seconds, self.overlap_seconds)
+        done = object()
+
+        def run():
+            try:
+                self._decode(session)
+            finally:
+                loop.call_soon_threadsafe(session.results.put_nowait, (done, None))
+
+        decoder = loop.run_in_executor(None, run)
+        received, total = 0, None
+        try:
+            while total is None or received < total:
+                segment, result = await session.results.get()
+                if segment is done:
+                    total = received + len(self._submitted)
+                    continue
+                start, end = self._submitted.popleft()
+                received += 1
+                self._slots.release()
+
+                if result is None:
+                    logging.error(f"Offline segment {start:.1f}-{end:.1f} s failed")
+                    continue
+                if segment.kind == "chunk":
+                    result = self._chunker.merge(result, segment.context)
+                    start, end = self._chunk_span(start, end, segment.context)
+                if result and result not in ignored:
+                    yield {"start": round(start, 2), "end": round(end, 2), "text": result}
+            await decoder
+        finally:
+            self._cancelled.set()
+            # Unblock the decoder if it waits for a slot
+            for _ in range(self.max_in_flight):
+                self._slots.release()
+            self.worker.close_session(session)
+
+    @staticmethod
+    def _chunk_span(start, end, context):
+        """Narrow a window's span to the part its merged words come from."""
+        window_start, lower, upper = context
+        offset = start - window_start / SAMPLE_RATE
+        return max(start, offset + lower / SAMPLE_RATE), min(end, offset + upper / SAMPLE_RATE)
+
+    async def run(self, ignored=()):
+        """Transcribe the whole file and return the result as one dict."""
+        started = time.perf_counter()
+        segments = [segment async for segment in self.segments(ignored)]
+        elapsed = time.perf_counter() - started
+        return {
+            "duration": round(self.duration, 2),
+            "processing_seconds": round(elapsed, 2),
+            "rtf": round(elapsed / self.duration, 3) if self.duration else None,
+            "segments": segments,
+        }
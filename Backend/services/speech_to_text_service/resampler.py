@@ -0,0 +1,138 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+# Largest reduced up/down factor accepted. The filter has 2 * half_taps * factor + 1
+# taps, so odd rates (e.g. 191999 Hz -> 16 kHz) would need millions of them;
+# every common rate to 16 kHz stays at or below 640 (11025 Hz).
+MAX_FACTOR = 1000
+
+
+def resample_factors(src_rate, dst_rate):
+    """Reduced (up, down) factors for resampling src_rate to dst_rate."""
+    g = math.gcd(src_rate, dst_rate)
+    return dst_rate // g, src_rate // g
+
+
+@lru_cache(maxsize=None)
+def _design_phases(up, down, half_taps, kaiser_beta):
+    """
+    Polyphase filter table for up/down, shared (read-only) by all resamplers
+    with the same factors.
+    """
+    # Same filter design as scipy.signal.resample_poly
+    max_rate = max(up, down)
+    num_taps = 2 * half_taps * max_rate + 1
+    h = signal.firwin(num_taps, 1.0 / max_rate, window=("kaiser", kaiser_beta)) * up
+
+    # Phase p of the polyphase filter holds h[p], h[p + up], h[p + 2*up], ...
+    # Reversed, so that a dot product with an ascending input window
+    # x[i - K + 1 .. i] applies h[p + k*up] to x[i - k].
+    taps = math.ceil(num_taps / up)
+    h = np.pad(h, (0, taps * up - num_taps))
+    phases = np.ascontiguousarray(h.reshape(taps, up).T[:, ::-1], dtype=np.float32)
+    phases.flags.writeable = False
+    return phases
+
+
+class StreamingResampler:
+    """
+    Polyphase FIR resampler for audio that arrives in chunks.
+
+    The filter history and the output phase are carried from one chunk to the
+    next, so the output is the same as resampling the whole stream at once:
+    no edge artifacts at chunk boundaries. Work buffers are reused between
+    calls and only grow when a larger chunk than before arrives.
+    """
+
+    def __init__(self, src_rate, dst_rate=16000, half_taps=10, kaiser_beta=5.0):
+        """
+        Raises:
+            ValueError: If the rates reduce to an up/down factor above MAX_FACTOR
+        """
+        if not self.supports(src_rate, dst_rate):
+            raise ValueError(f"Can't resample {src_rate} Hz to {dst_rate} Hz: factor above {MAX_FACTOR}")
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.up, self.down = resample_factors(src_rate, dst_rate)
+        self.passthrough = self.up == self.down
+
+        if self.passthrough:
+            return
+
+        # Designed once per factor pair, not per stream
+        self._phases = _design_phases(self.up, self.down, half_taps, kaiser_beta)
+        self.taps = self._phases.shape[1]
+
+        # Position of the next output sample on the upsampled time axis,
+        # relative to the first sample of the next input chunk
+        self._offset = 0
+        self._capacity = 0
+        self._buf = np.zeros(self.taps - 1, dtype=np.float32)
+
+    @staticmethod
+    def supports(src_rate, dst_rate=16000):
+        """Whether src_rate -> dst_rate needs a filter of reasonable size."""
+        return src_rate > 0 and max(resample_factors(src_rate, dst_rate)) <= MAX_FACTOR
+
+    def _ensure_capacity(self, length):
+        if length <= self._capacity:
+            return
+        capacity = max(length, 2 * self._capacity)
+        history = self._buf[:self.taps - 1].copy()
+        max_out = (capacity * self.up + self._offset) // self.down + 2
+
+        self._buf = np.zeros(self.taps - 1 + capacity, dtype=np.float32)
+        self._buf[:self.taps - 1] = history
+        self._steps = np.arange(max_out, dtype=np.int64) * self.down
+        self._positions = np.empty(max_out, dtype=np.int64)
+        self._indices = np.empty(max_out, dtype=np.int64)
+        self._phase_ids = np.empty(max_out, dtype=np.int64)
+        self._windows = np.empty((max_out, self.taps), dtype=np.float32)
+        self._coeffs = np.empty((max_out, self.taps), dtype=np.float32)
+        self._out = np.empty(max_out, dtype=np.float32)
+        self._capacity = capacity
+
+    def process(self, chunk):
+        """
+        Resample the next chunk of the stream.
+
+        The returned array is a view into an internal buffer that is reused by
+        the next call; copy it if it has to outlive that.
+        """
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if self.passthrough:
+            return chunk
+
+        length = len(chunk)
+        self._ensure_capacity(length)
+        history = self.taps - 1
+        buf = self._buf
+        buf[history:history + length] = chunk
+
+        # Outputs whose last input sample falls inside this chunk
+        limit = length * self.up
+        n_out = max(0, -(-(limit - self._offset) // self.down))
+
+        positions = np.add(self._steps[:n_out], self._offset, out=self._positions[:n_out])
+        indices = np.floor_divide(positions, self.up, out=self._indices[:n_out])
+        phase_ids = np.remainder(positions, self.up, out=self._phase_ids[:n_out])
+
+        windows = sliding_window_view(buf[:history + length], self.taps)
+        gathered = np.take(windows, indices, axis=0, out=self._windows[:n_out], mode="clip")
+        coeffs = np.take(self._phases, phase_ids, axis=0, out=self._coeffs[:n_out], mode="clip")
+        out = np.einsum("nk,nk->n", gathered, coeffs, out=self._out[:n_out])
+
+        # Keep the last taps-1 input samples as filter history for the next chunk
+        buf[:history] = buf[length:length + history]
+        self._offset += n_out * self.down - limit
+        return out
+
+    def reset(self):
+        if self.passthrough:
+            return
+        self._buf[:] = 0
+        self._offset = 0
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity float32 ring buffer for mono audio.
+
+    Every sample is stored twice, at i and i + capacity, so the current
+    contents are always one contiguous slice and view() never copies.
+    Appending costs two copies of the new samples regardless of how much
+    audio is buffered. When full, the oldest samples are dropped.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._data = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._start = 0
+        self._size = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if len(samples) > self.capacity:
+            self.dropped += len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+
+        overflow = self._size + len(samples) - self.capacity
+        if overflow > 0:
+            self.consume(overflow)
+            self.dropped += overflow
+
+        cap = self.capacity
+        pos = (self._start + self._size) % cap
+        first = min(len(samples), cap - pos)
+        rest = len(samples) - first
+        data = self._data
+        data[pos:pos + first] = samples[:first]
+        data[pos + cap:pos + cap + first] = samples[:first]
+        if rest:
+            data[:rest] = samples[first:]
+            data[cap:cap + rest] = samples[first:]
+        self._size += len(samples)
+
+    def view(self):
+        """
+        Contiguous, read-only view of the buffered audio, oldest sample first.
+
+        The view is only valid until the next append().
+        """
+        view = self._data[self._start:self._start + self._size]
+        view.flags.writeable = False
+        return view
+
+    def consume(self, count):
+        """Drop the oldest count samples."""
+        count = min(int(count), self._size)
+        self._start = (self._start + count) % self.capacity
+        self._size -= count
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
@@ -1,115 +1,389 @@
 import asyncio
+import json
 import logging
 import os
+import tempfile
 import time
 import uuid
 
-import numpy as np
 from aiohttp import web
 import aiohttp_cors
-from baseline_pipeline import pipe, block_size
-from scipy import signal
+from model_manager import ModelManager
+from resampler import StreamingResampler
+from chunking import UtteranceChunker
+from asr_worker import ASRWorker
+from vad import SpeechSegmenter
+from streaming import StreamingTranscriber
+from offline import OfflineTranscription, probe, SOUNDFILE_AVAILABLE
+from metrics import Metrics
+from summarizer import Summarizer
+from audio_codecs import available_codecs, create_decoder
+from voice_diagram import VoiceDiagram
 
-logging.basicConfig(level=logging.DEBUG)
+# DEBUG logs every frame in aiohttp; sampled structured logs come from metrics.log_event
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+TARGET_SAMPLE_RATE = 16000
+DEFAULT_CLIENT_SAMPLE_RATE = 48000
+# Standard rates only: odd ones would need a huge resampling filter
+SUPPORTED_SAMPLE_RATES = (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000, 96000)
+# Longest segment sent to ASR at once; Whisper sees at most 30 s. Longer speech is
+# split into windows of this size that overlap by CHUNK_OVERLAP_SECONDS
+MAX_UTTERANCE_SECONDS = 30
+CHUNK_OVERLAP_SECONDS = 5
+# Finished utterances a session may have waiting for the ASR worker
+MAX_SESSION_BACKLOG = int(os.getenv("ASR_MAX_SESSION_BACKLOG", "3"))
+# Micro-batching across sessions
+ASR_MAX_BATCH_SIZE = int(os.getenv("ASR_MAX_BATCH_SIZE", "8"))
+ASR_MAX_WAIT_MS = float(os.getenv("ASR_MAX_WAIT_MS", "50"))
+# Streaming mode (?mode=streaming): sliding window re-decoded every STREAMING_UPDATE_MS
+STREAMING_UPDATE_MS = int(os.getenv("STREAMING_UPDATE_MS", "500"))
+STREAMING_WINDOW_SECONDS = int(os.getenv("STREAMING_WINDOW_SECONDS", "20"))
+MODES = ("text", "streaming", "diagram")
+# Stability point of the voice-to-diagram pipeline: the first diagram waits for this much description
+DIAGRAM_MIN_CHARS = int(os.getenv("DIAGRAM_MIN_CHARS", "200"))
+DIAGRAM_MIN_SEGMENTS = int(os.getenv("DIAGRAM_MIN_SEGMENTS", "2"))
+# Offline transcription of uploaded recordings (POST /transcribe)
+SPOOL_DIR = os.getenv("TRANSCRIBE_SPOOL_DIR") or None
+TRANSCRIBE_MAX_MB = int(os.getenv("TRANSCRIBE_MAX_MB", "500"))
+TRANSCRIBE_MAX_IN_FLIGHT = int(os.getenv("TRANSCRIBE_MAX_IN_FLIGHT", "16"))
+SUMMARIES_ENABLED = os.getenv("SUMMARIES_ENABLED", "0") == "1"
+IGNORED_RESULTS = ["Продолжение следует...", "Спасибо."]
 
 
 class AudioProcessor:
-    def __init__(self):
-        self.buffer = np.empty((0, 1), dtype=np.float32)
-        self.silence_duration = 0
-        self.is_speaking = False
+    def __init__(self, sample_rate=DEFAULT_CLIENT_SAMPLE_RATE, mode="text", codec="pcm"):
+        self.decoder = create_decoder(codec, sample_rate, TARGET_SAMPLE_RATE)
+        self.resampler = StreamingResampler(self.decoder.sample_rate, TARGET_SAMPLE_RATE)
+        self.segmenter = SpeechSegmenter(sample_rate=TARGET_SAMPLE_RATE)
         self.last_sent_text = None
-        self.min_speech_duration = 0.5
-        self.silence_threshold = 0.01
-        self.speech_started_at = None
+        self.mode = mode
+        self.metrics = None
+        self.summary_id = None
+        self.diagram = None
+        if mode == "streaming":
+            self.stream = StreamingTranscriber(TARGET_SAMPLE_RATE, STREAMING_WINDOW_SECONDS, STREAMING_UPDATE_MS)
+        else:
+            self.chunker = UtteranceChunker(TARGET_SAMPLE_RATE, MAX_UTTERANCE_SECONDS, CHUNK_OVERLAP_SECONDS)
+
+    @property
+    def buffered_samples(self):
+        return len(self.stream.buffer) if self.mode == "streaming" else len(self.chunker)
+
+
+def client_sample_rate(request):
+    """Sample rate of the client's PCM stream, negotiated via ?sample_rate= at connect time."""
+    value = request.query.get('sample_rate', str(DEFAULT_CLIENT_SAMPLE_RATE))
+    try:
+        sample_rate = int(value)
+    except ValueError:
+        sample_rate = None
+    if sample_rate not in SUPPORTED_SAMPLE_RATES:
+        raise web.HTTPBadRequest(text=f"Unsupported sample_rate: {value}")
+    return sample_rate
+
+
+# Loaded in the background on startup; the worker waits for it on first use
+model_manager = ModelManager()
+metrics = Metrics()
+# Off by default: rolling summaries send every transcript to the external LLM
+summarizer = Summarizer() if SUMMARIES_ENABLED else None
+asr_worker = ASRWorker(model_manager.transcribe_batch, max_batch_size=ASR_MAX_BATCH_SIZE, max_wait_ms=ASR_MAX_WAIT_MS,
+                       max_backlog=MAX_SESSION_BACKLOG,
+                       max_segment_samples=MAX_UTTERANCE_SECONDS * TARGET_SAMPLE_RATE)
+
+
+def client_mode(request):
+    """
+    Result protocol: 'text' sends plain final transcripts, 'streaming' JSON
+    partial/final messages, 'diagram' JSON transcripts and BPMN diagram updates.
+    """
+    mode = request.query.get('mode', 'text')
+    if mode not in MODES:
+        raise web.HTTPBadRequest(text=f"Unsupported mode: {mode}")
+    return mode
+
+
+def requested_codec(request):
+    """
+    Frame format asked for with ?codec=. Clients can also negotiate it as a
+    WebSocket subprotocol (offer ["opus", "pcm"]), which falls back to PCM
+    by itself when the server can't decode Opus.
+    """
+    codec = request.query.get('codec')
+    if codec is not None and codec not in available_codecs():
+        raise web.HTTPBadRequest(text=f"Unsupported codec: {codec} (available: {', '.join(available_codecs())})")
+    return codec
+
+
+async def send_results(ws, session, processor):
+    """Forward transcripts from the ASR worker to the client."""
+    while True:
+        segment, result = await session.results.get()
+        if result is None:
+            continue
+        if segment.kind in ("utterance", "chunk"):
+            if segment.kind == "chunk":
+                result = processor.chunker.merge(result, segment.context)
+            sent = bool(result) and result not in IGNORED_RESULTS and result != processor.last_sent_text
+            if sent:
+                if processor.diagram is not None:
+                    await ws.send_json({"type": "transcript", "text": result})
+                    processor.diagram.add_segment(result)
+                else:
+                    await ws.send_str(result)
+                processor.last_sent_text = result
+                if summarizer:
+                    summarizer.add_segment(processor.summary_id, result)
+            metrics.record_result(processor.metrics, segment, sent)
+            continue
+
+        message = processor.stream.apply(result, segment.context, final=segment.kind == "final")
+        sent = message is not None and bool(message["text"]) and message["text"] not in IGNORED_RESULTS
+        if sent:
+            await ws.send_json(message)
+            if message["type"] == "final" and summarizer:
+                summarizer.add_segment(processor.summary_id, message["text"])
+        metrics.record_result(processor.metrics, segment, sent)
+
+
+def handle_speech_events(processor, session, events):
+    """Feed VAD events into the utterance chunker or the streaming window."""
+    def submit(audio, kind, context):
+        asr_worker.submit(session, audio, kind=kind, context=context)
+        metrics.record_submit(processor.metrics)
+
+    for event, audio in events:
+        if processor.mode == "streaming":
+            stream = processor.stream
+            if event == "speech":
+                if stream.append(audio):
+                    window, span = stream.window()
+                    submit(window, "window", span)
+            elif event == "end" or stream.has_text:
+                window, span = stream.window()
+                submit(window, "final", span)
+            else:
+                stream.discard()
+        elif event == "speech":
+            processor.chunker.append(audio, submit)
+        elif event == "end":
+            processor.chunker.finish(submit)
+        else:
+            processor.chunker.discard()
+
+
+def handle_diagram_command(diagram, data):
+    """
+    Control messages of a diagram session:
+    {"type": "diagram", "bpmn_xml": ...} edits an existing diagram instead of starting a new one,
+    {"type": "generate"} builds the diagram now without waiting for the stability point.
+    """
+    try:
+        command = json.loads(data)
+    except ValueError:
+        command = None
+    if not isinstance(command, dict):
+        logging.warning("Ignoring an unknown text message on a diagram session")
+        return
+    if command.get("type") == "diagram" and command.get("bpmn_xml"):
+        diagram.set_diagram(command["bpmn_xml"])
+    elif command.get("type") == "generate":
+        diagram.flush()
 
 
 async def websocket_handler(request):
-    ws = web.WebSocketResponse()
+    sample_rate = client_sample_rate(request)
+    mode = client_mode(request)
+    codec = requested_codec(request)
+    ws = web.WebSocketResponse(protocols=available_codecs())
     await ws.prepare(request)
+    codec = ws.ws_protocol or codec or "pcm"
 
-    processor = AudioProcessor()
-    logging.info('WebSocket connection opened')
+    processor = AudioProcessor(sample_rate, mode, codec)
+    session = asr_worker.open_session()
+    processor.metrics = metrics.open_session(session.id, mode, processor.decoder.sample_rate, codec)
+    # Summaries are kept per meeting; several connections may share one via ?session_id=
+    processor.summary_id = request.query.get('session_id') or session.id
+    if mode == "diagram":
+        processor.diagram = VoiceDiagram(ws.send_json, min_chars=DIAGRAM_MIN_CHARS, min_segments=DIAGRAM_MIN_SEGMENTS)
+    if mode != "text":
+        await ws.send_json({"type": "session", "session_id": processor.summary_id})
+    sender = asyncio.create_task(send_results(ws, session, processor))
+    logging.info(f'WebSocket connection {session.id} opened ({codec}, {processor.decoder.sample_rate} Hz, {mode})')
 
     try:
         async for msg in ws:
             if msg.type == web.WSMsgType.BINARY:
                 try:
-                    if len(msg.data) <= 2:
-                        continue
-                        
-                    audio_chunk = np.frombuffer(msg.data, dtype=np.int16)
-                    
-                    if len(audio_chunk) == 0:
+                    float_data = processor.decoder.decode(msg.data)
+                    if len(float_data) == 0:
                         continue
-                        
-                    float_data = audio_chunk.astype(np.float32) / 32768.0
-                    
-                    if len(float_data) <= 3:
+
+                    resampled_data = processor.resampler.process(float_data)
+                    if resampled_data.size == 0:
                         continue
-                        
-                    resampled_data = signal.resample(float_data, len(float_data) // 3)
-                    current_amplitude = np.max(np.abs(resampled_data))
-
-                    is_current_chunk_speech = current_amplitude > processor.silence_threshold
-
-                    if is_current_chunk_speech:
-                        if not processor.is_speaking:
-                            processor.is_speaking = True
-                            processor.speech_started_at = time.time()
-                            logging.info("Speech started")
-                        processor.silence_duration = 0
-                    else:
-                        processor.silence_duration += len(resampled_data) / 16000
-
-                    if resampled_data.size > 0:
-                        processor.buffer = np.concatenate([
-                            processor.buffer,
-                            resampled_data.reshape(-1, 1)
-                        ])
-
-                    should_process = (
-                        processor.is_speaking and
-                        processor.silence_duration > 0.3 and
-                        (time.time() - processor.speech_started_at) > processor.min_speech_duration
-                    )
-
-                    if should_process:
-                        logging.info(f"Processing speech chunk of length {processor.buffer.shape[0]}")
-                        chunk = processor.buffer.flatten()
-                        processor.buffer = np.empty((0, 1), dtype=np.float32)
-                        processor.is_speaking = False
-
-                        try:
-                            result = pipe(chunk, generate_kwargs={
-                                "language": "ru",
-                                "task": "transcribe"
-                            })["text"].strip()
-
-                            if result and result not in ["Продолжение следует...", "Спасибо."] and result != processor.last_sent_text:
-                                logging.info(f"Sending result: {result}")
-                                await ws.send_str(result)
-                                processor.last_sent_text = result
-
-                        except Exception as e:
-                            logging.error(f"ASR Error: {e}")
-
-                    elif processor.silence_duration > 1.0:
-                        processor.buffer = np.empty((0, 1), dtype=np.float32)
-                        processor.is_speaking = False
+
+                    # Only speech goes on to ASR; silence and noise are dropped here
+                    handle_speech_events(processor, session, processor.segmenter.push(resampled_data))
+                    metrics.record_frame(processor.metrics, len(msg.data), len(float_data),
+                                         processor.segmenter, processor.buffered_samples)
 
                 except Exception as e:
                     logging.error(f"Error processing audio chunk: {e}")
+            elif msg.type == web.WSMsgType.TEXT and processor.diagram is not None:
+                handle_diagram_command(processor.diagram, msg.data)
 
     except Exception as e:
         logging.error(f"Error in websocket handler: {e}")
     finally:
-        logging.info('WebSocket connection closed')
+        asr_worker.close_session(session)
+        metrics.close_session(processor.metrics)
+        if summarizer:
+            summarizer.close(processor.summary_id)
+        if processor.diagram is not None:
+            processor.diagram.close()
+        sender.cancel()
+        logging.info(f'WebSocket connection {session.id} closed')
 
     return ws
 
 
+async def spool_upload(request):
+    """
+    Write the 'file' field of a multipart upload to a temporary file in chunks.
+
+    Returns:
+        Path of the spooled file
+    """
+    if not request.content_type.startswith('multipart/'):
+        raise web.HTTPBadRequest(text="Expected a multipart upload with a 'file' field")
+    reader = await request.multipart()
+    field = await reader.next()
+    while field is not None and field.name != 'file':
+        field = await reader.next()
+    if field is None:
+        raise web.HTTPBadRequest(text="Missing 'file' field")
+
+    suffix = os.path.splitext(field.filename or '')[1].lower()
+    limit = TRANSCRIBE_MAX_MB * 1024 * 1024
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="upload_", dir=SPOOL_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = await field.read_chunk(1024 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise web.HTTPRequestEntityTooLarge(max_size=limit, actual_size=size)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+async def transcribe_handler(request):
+    """
+    Transcribe an uploaded recording (WAV/FLAC/OGG) faster than real time.
+
+    Returns {"duration", "processing_seconds", "rtf", "segments": [{"start", "end", "text"}]},
+    or with ?format=ndjson one segment per line as they are ready, then a summary line.
+    """
+    if not SOUNDFILE_AVAILABLE:
+        raise web.HTTPNotImplemented(text="Offline transcription needs the soundfile package")
+    output = request.query.get('format', 'json')
+    if output not in ('json', 'ndjson'):
+        raise web.HTTPBadRequest(text=f"Unsupported format: {output}")
+
+    path = await spool_upload(request)
+    try:
+        try:
+            info = await asyncio.to_thread(probe, path)
+        except RuntimeError as e:
+            raise web.HTTPUnsupportedMediaType(text=f"Unsupported or corrupt audio file: {e}")
+        if not StreamingResampler.supports(info["sample_rate"], TARGET_SAMPLE_RATE):
+            raise web.HTTPUnsupportedMediaType(text=f"Unsupported sample rate: {info['sample_rate']} Hz")
+        logging.info(f"Transcribing upload: {info}")
+        job = OfflineTranscription(asr_worker, path, max_in_flight=TRANSCRIBE_MAX_IN_FLIGHT,
+                                   window_seconds=MAX_UTTERANCE_SECONDS, overlap_seconds=CHUNK_OVERLAP_SECONDS)
+
+        if output == 'json':
+            return web.json_response(await job.run(ignored=IGNORED_RESULTS))
+
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+        started = time.perf_counter()
+        count = 0
+        async for segment in job.segments(ignored=IGNORED_RESULTS):
+            await response.write((json.dumps({"type": "segment", **segment}, ensure_ascii=False) + "\n").encode('utf-8'))
+            count += 1
+        elapsed = time.perf_counter() - started
+        summary = {"type": "summary", "segments": count, "duration": round(job.duration, 2),
+                   "processing_seconds": round(elapsed, 2),
+                   "rtf": round(elapsed / job.duration, 3) if job.duration else None}
+        await response.write((json.dumps(summary) + "\n").encode('utf-8'))
+        await response.write_eof()
+        return response
+    finally:
+        os.remove(path)
+
+
+async def summaries_handler(request):
+    """Rolling summary of a session: GET /api/summaries?session_id=..."""
+    if not summarizer:
+        raise web.HTTPNotImplemented(text="Summaries are disabled (set SUMMARIES_ENABLED=1)")
+    session_id = request.query.get('session_id')
+    if not session_id:
+        raise web.HTTPBadRequest(text="session_id is required")
+    summary = summarizer.get(session_id)
+    if summary is None:
+        raise web.HTTPNotFound(text=f"No transcript for session {session_id}")
+    return web.json_response(summary)
+
+
+async def stats_handler(request):
+    return web.json_response({
+        "asr": asr_worker.stats(),
+        "model": model_manager.status(),
+    })
+
+
+async def metrics_handler(request):
+    """Global and per-session metrics, plus ASR worker and model state."""
+    return web.json_response({
+        "global": metrics.snapshot(),
+        "sessions": {session_id: session.to_dict() for session_id, session in metrics.sessions.items()},
+        "asr": asr_worker.stats(),
+        "model": model_manager.status(),
+    })
+
+
+async def health_handler(request):
+    """Liveness: the process is up, whether or not the model has loaded."""
+    return web.json_response({"status": "ok"})
+
+
+async def ready_handler(request):
+    """Readiness: 200 once the model is loaded and warmed up, 503 before that."""
+    status = model_manager.status()
+    return web.json_response(status, status=200 if model_manager.ready else 503)
+
+
+async def start_worker(app):
+    model_manager.start()
+    asr_worker.start()
+
+
+async def stop_worker(app):
+    asr_worker.stop()
+
+
 app = web.Application()
+app.on_startup.append(start_worker)
+app.on_cleanup.append(stop_worker)
 cors = aiohttp_cors.setup(app, defaults={
     "*": aiohttp_cors.ResourceOptions(
         allow_credentials=True,
@@ -119,6 +393,12 @@ cors = aiohttp_cors.setup(app, defaults={
 })
 
 app.router.add_get('/ws', websocket_handler)
+app.router.add_post('/transcribe', transcribe_handler)
+app.router.add_get('/api/summaries', summaries_handler)
+app.router.add_get('/stats', stats_handler)
+app.router.add_get('/metrics', metrics_handler)
+app.router.add_get('/health', health_handler)
+app.router.add_get('/ready', ready_handler)
 
 for route in list(app.router.routes()):
     cors.add(route)
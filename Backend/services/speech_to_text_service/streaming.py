@@ -0,0 +1,136 @@
+import re
+
+from ring_buffer import AudioRingBuffer
+
+
+def _normalize(word):
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+class StreamingTranscriber:
+    """
+    LocalAgreement streaming for one session.
+
+    Audio of the current utterance is kept in a window that is re-decoded
+    every update_ms of new speech. A word is committed once two consecutive
+    hypotheses agree on it (the common prefix of the uncommitted words), and
+    the audio up to the end of the last committed word is trimmed from the
+    window. Decoding cost per update is therefore bounded by the window
+    length, not by how long the utterance has been going on.
+
+    Positions are tracked as absolute sample indices of the session's speech
+    stream, so results that arrive after the window was trimmed still line up.
+    """
+
+    def __init__(self, sample_rate=16000, window_seconds=20, update_ms=500):
+        self.sample_rate = sample_rate
+        self.update_samples = sample_rate * update_ms // 1000
+        self.buffer = AudioRingBuffer(sample_rate * window_seconds)
+        self.buffer_start = 0    # absolute index of the first sample in the window
+        self.committed = []      # words of the current utterance agreed on so far
+        self.committed_until = 0
+        self.previous = []       # uncommitted words of the last hypothesis
+        self._since_update = 0
+
+    def append(self, audio):
+        """
+        Add speech to the window.
+
+        Returns:
+            True when enough new audio arrived for the next re-decode
+        """
+        overflow = len(self.buffer) + len(audio) - self.buffer.capacity
+        if overflow > 0 and self.previous:
+            # The window is full without agreement: accept the last hypothesis
+            # rather than lose its audio
+            self._commit(self.previous)
+            self.previous = []
+        dropped = self.buffer.dropped
+        self.buffer.append(audio)
+        self.buffer_start += self.buffer.dropped - dropped
+        self._since_update += len(audio)
+        return self._since_update >= self.update_samples
+
+    def window(self):
+        """
+        Current window audio and its (start, end) absolute sample range.
+
+        Marks the window as submitted for decoding.
+        """
+        self._since_update = 0
+        return self.buffer.view(), (self.buffer_start, self.buffer_start + len(self.buffer))
+
+    @property
+    def has_text(self):
+        return bool(self.committed or self.previous)
+
+    def discard(self):
+        """Drop the window without a transcript (e.g. a cough the VAD let through)."""
+        end = self.buffer_start + len(self.buffer)
+        self.committed = []
+        self.previous = []
+        self.committed_until = max(self.committed_until, end)
+        self._trim(end)
+
+    def _commit(self, words):
+        self.committed.extend(word for word, _, _ in words)
+        self.committed_until = max(self.committed_until, words[-1][2])
+        self._trim(self.committed_until)
+
+    def _trim(self, position):
+        count = min(position - self.buffer_start, len(self.buffer))
+        if count > 0:
+            self.buffer.consume(count)
+            self.buffer_start += count
+
+    def _absolute(self, words, start):
+        result = []
+        for text, word_start, word_end in words:
+            if not text:
+                continue
+            begin = start + int(word_start * self.sample_rate)
+            end = start + int((word_end if word_end is not None else word_start) * self.sample_rate)
+            # Skip words whose audio was already committed
+            if (begin + end) // 2 < self.committed_until:
+                continue
+            result.append((text, begin, end))
+        return result
+
+    def apply(self, words, span, final=False):
+        """
+        Merge a decoding result into the transcript.
+
+        Args:
+            words: (word, start_seconds, end_seconds) relative to the decoded window
+            span: Absolute (start, end) sample range of the decoded window
+            final: The window was the end of the utterance: commit everything
+
+        Returns:
+            Message for the client: {"type": "partial", "text", "committed"}
+            or {"type": "final", "text"}; None when there's nothing to say
+        """
+        start, end = span
+        current = self._absolute(words, start)
+
+        if final:
+            text = " ".join(self.committed + [word for word, _, _ in current])
+            self.committed = []
+            self.previous = []
+            self.committed_until = max(self.committed_until, end)
+            self._trim(end)
+            return {"type": "final", "text": text.strip()}
+
+        agreed = 0
+        for (word, _, _), (before, _, _) in zip(current, self.previous):
+            if _normalize(word) != _normalize(before):
+                break
+            agreed += 1
+        if agreed:
+            self._commit(current[:agreed])
+        self.previous = current[agreed:]
+
+        committed = " ".join(self.committed)
+        tentative = " ".join(word for word, _, _ in self.previous)
+        if not committed and not tentative:
+            return None
+        return {"type": "partial", "text": f"{committed} {tentative}".strip(), "committed": committed}
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+
+from bpmn_agent_client import load_llm
+
+
+SUMMARY_PROMPT = """Ты ведёшь краткий конспект встречи. Ниже текущий конспект и новые фрагменты расшифровки.
+Обнови конспект с учётом новых фрагментов: сохрани важное из текущего, добавь новые решения, задачи и темы.
+Ответь только обновлённым конспектом: не больше {max_points} пунктов, каждый с новой строки и начинается с "- ".
+
+Текущий конспект:
+{summary}
+
+Новые фрагменты расшифровки:
+{segments}"""
+
+
+class RollingSummary:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.points = []
+        self.pending = []
+        self.segments = 0
+        self.dropped_segments = 0
+        self.updates = 0
+        self.updated_at = None
+        self.closed_at = None
+        self.updating = False
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "summaries": self.points,
+            "segments": self.segments,
+            "pending_segments": len(self.pending),
+            "dropped_segments": self.dropped_segments,
+            "updates": self.updates,
+            "updated_at": self.updated_at,
+            "active": self.closed_at is None,
+        }
+
+
+class Summarizer:
+    """
+    Rolling per-session meeting summaries.
+
+    Each update sends the LLM only the previous summary and the transcript
+    segments that arrived since, both capped in size, so the cost of an
+    update stays constant however long the meeting runs. Updates run in a
+    thread (the LLM client is blocking), at most one at a time per session;
+    segments arriving meanwhile wait for the next one. While the LLM keeps
+    failing, waiting text is capped at max_pending_chars per session by
+    dropping the oldest segments.
+    """
+
+    def __init__(self, llm=None, min_new_chars=600, max_new_chars=4000, max_points=10, ttl_seconds=24 * 3600,
+                 max_pending_chars=16000):
+        """
+        Args:
+            llm: Callable prompt -> text; defaults to call_deepseek_api
+            min_new_chars: New transcript text needed before an update is started
+            max_new_chars: Most new transcript text sent in one update (the rest waits)
+            max_points: Summary length in bullet points
+            ttl_seconds: How long summaries of closed sessions are kept
+            max_pending_chars: Most transcript text kept waiting for an update per session
+        """
+        self._llm = llm
+        self.min_new_chars = min_new_chars
+        self.max_new_chars = max_new_chars
+        self.max_points = max_points
+        self.ttl_seconds = ttl_seconds
+        self.max_pending_chars = max_pending_chars
+        self.sessions = {}
+
+    def add_segment(self, session_id, text):
+        """Record a final transcript segment and start an update if enough new text piled up."""
+        self._expire()
+        state = self.sessions.get(session_id)
+        if state is None:
+            state = self.sessions[session_id] = RollingSummary(session_id)
+        state.closed_at = None
+        state.pending.append(text)
+        state.segments += 1
+        self._trim_pending(state)
+        if sum(len(segment) for segment in state.pending) >= self.min_new_chars:
+            self._schedule(state)
+
+    def close(self, session_id):
+        """The session ended: fold in what is left and keep the summary for ttl_seconds."""
+        self._expire()
+        state = self.sessions.get(session_id)
+        if state is None:
+            return
+        state.closed_at = time.time()
+        if state.pending:
+            self._schedule(state)
+
+    def get(self, session_id):
+        self._expire()
+        state = self.sessions.get(session_id)
+        return state.to_dict() if state else None
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        for session_id in [s.session_id for s in self.sessions.values() if s.closed_at and s.closed_at < cutoff]:
+            del self.sessions[session_id]
+
+    def _trim_pending(self, state):
+        """Drop the oldest waiting segments beyond max_pending_chars (the LLM is failing or slow)."""
+        size = sum(len(segment) for segment in state.pending)
+        while len(state.pending) > 1 and size > self.max_pending_chars:
+            size -= len(state.pending.pop(0))
+            state.dropped_segments += 1
+
+    def _schedule(self, state):
+        if not state.updating:
+            state.updating = True
+            asyncio.get_running_loop().create_task(self._update(state))
+
+    def _take_pending(self, state):
+        taken, size = [], 0
+        while state.pending and (not taken or size + len(state.pending[0]) <= self.max_new_chars):
+            segment = state.pending.pop(0)
+            taken.append(segment[:self.max_new_chars])
+            size += len(taken[-1])
+        return taken
+
+    async def _update(self, state):
+        try:
+            while state.pending:
+                segments = self._take_pending(state)
+                prompt = SUMMARY_PROMPT.format(
+                    max_points=self.max_points,
+                    summary="\n".join(f"- {point}" for point in state.points) or "(пока пусто)",
+                    segments="\n".join(segments),
+                )
+                try:
+                    if self._llm is None:
+                        self._llm = load_llm()
+                    response = await asyncio.to_thread(self._llm, prompt)
+                except Exception as e:
+                    logging.error(f"Summary update for {state.session_id} failed: {e}")
+                    # Put the segments back for the next attempt, within the cap
+                    state.pending[:0] = segments
+                    self._trim_pending(state)
+                    return
+                points = self._parse_points(response)
+                if points:
+                    state.points = points
+                    state.updates += 1
+                    state.updated_at = time.time()
+                # Only keep going on a closed session; a live one waits for min_new_chars again
+                if state.closed_at is None and sum(len(s) for s in state.pending) < self.min_new_chars:
+                    break
+        finally:
+            state.updating = False
+
+    def _parse_points(self, response):
+        lines = [line.strip() for line in (response or "").splitlines()]
+        points = [line.lstrip("-*• ").strip() for line in lines if line and line[0] in "-*•"]
+        points = [point for point in points if point]
+        if not points:
+            points = [line for line in lines if line]
+        return points[:self.max_points]
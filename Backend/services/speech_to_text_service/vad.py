@@ -0,0 +1,229 @@
+import logging
+import os
+from collections import deque
+
+import numpy as np
+
+try:
+    import webrtcvad
+    WEBRTC_AVAILABLE = True
+except ImportError:
+    WEBRTC_AVAILABLE = False
+
+
+class EnergyVAD:
+    """
+    Frame-level voice activity detection from energy and spectral shape.
+
+    A frame is speech when its voice band (300-4000 Hz) energy is well above
+    the noise floor and its spectrum in that band is not flat (hum, fans and
+    street noise are close to flat, voiced speech has harmonics). Measuring
+    energy in the voice band keeps low-frequency rumble (traffic, HVAC) from
+    dominating it. The noise floor is tracked with minimum statistics: it is
+    the quietest frame of the last floor_window_ms, seeded from the first
+    frame. Speech has pauses between syllables and words, so the minimum
+    follows the background, while steady noise is the floor itself and never
+    rises above it.
+    """
+
+    def __init__(self, sample_rate=16000, threshold_db=9.0, min_energy_db=-55.0,
+                 max_flatness=0.5, floor_window_ms=1500):
+        """
+        Args:
+            sample_rate: Sample rate of the frames
+            threshold_db: How far above the noise floor a speech frame must be
+            min_energy_db: Frames quieter than this (voice band dBFS) are never speech
+            max_flatness: Frames with a flatter voice band spectrum are treated as noise
+            floor_window_ms: How far back the noise floor minimum looks
+        """
+        self.sample_rate = sample_rate
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.max_flatness = max_flatness
+        self.floor_window_ms = floor_window_ms
+        self.noise_floor_db = None
+        self._history = None
+        self._window = None
+        self._band = None
+        self._scale = None
+
+    def _features(self, frames):
+        frame_len = frames.shape[1]
+        if self._window is None or len(self._window) != frame_len:
+            self._window = np.hanning(frame_len).astype(np.float32)
+            freqs = np.fft.rfftfreq(frame_len, 1.0 / self.sample_rate)
+            self._band = (freqs >= 300) & (freqs <= 4000)
+            # Parseval: one-sided band power back to mean square, undoing the window
+            self._scale = 2.0 / (frame_len * np.sum(self._window ** 2))
+            frame_ms = 1000 * frame_len / self.sample_rate
+            self._history = deque(self._history or (), maxlen=max(1, int(self.floor_window_ms / frame_ms)))
+
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1))[:, self._band] ** 2 + 1e-12
+        energy_db = 10 * np.log10(np.sum(power, axis=1) * self._scale + 1e-10)
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        return energy_db, flatness
+
+    def classify(self, frames):
+        """
+        Args:
+            frames: Array of shape (n_frames, frame_len), float32 in [-1, 1]
+
+        Returns:
+            Boolean array with one speech decision per frame
+        """
+        energy_db, flatness = self._features(frames)
+        decisions = np.zeros(len(frames), dtype=bool)
+        for i in range(len(frames)):
+            self._history.append(energy_db[i])
+            self.noise_floor_db = min(self._history)
+            decisions[i] = (energy_db[i] > self.min_energy_db and
+                            energy_db[i] > self.noise_floor_db + self.threshold_db and
+                            flatness[i] < self.max_flatness)
+        return decisions
+
+
+class WebRTCVAD:
+    """Google's WebRTC VAD (GMM based, CPU only); needs the optional webrtcvad package."""
+
+    def __init__(self, sample_rate=16000, aggressiveness=2):
+        if not WEBRTC_AVAILABLE:
+            raise ImportError("webrtcvad is not installed")
+        self.sample_rate = sample_rate
+        self._vad = webrtcvad.Vad(aggressiveness)
+
+    def classify(self, frames):
+        pcm = (np.clip(frames, -1.0, 1.0) * 32767).astype(np.int16)
+        return np.array([self._vad.is_speech(frame.tobytes(), self.sample_rate) for frame in pcm], dtype=bool)
+
+
+def create_vad(backend=None, sample_rate=16000):
+    """
+    Build the VAD configured by VAD_BACKEND ('energy' or 'webrtc').
+
+    Falls back to the energy VAD when webrtcvad is not installed.
+    """
+    backend = backend or os.getenv("VAD_BACKEND", "energy")
+    if backend == "webrtc":
+        if WEBRTC_AVAILABLE:
+            return WebRTCVAD(sample_rate, int(os.getenv("VAD_AGGRESSIVENESS", "2")))
+        logging.warning("webrtcvad is not installed, using the energy VAD")
+    return EnergyVAD(sample_rate)
+
+
+class SpeechSegmenter:
+    """
+    Turns a stream of audio into utterances using frame-level VAD decisions.
+
+    An utterance starts after start_ms of consecutive speech frames and
+    includes pre_roll_ms before that, so word onsets aren't clipped. It ends
+    after hangover_ms of non-speech, which bridges short pauses between
+    words. Utterances with less than min_speech_ms of speech are cancelled.
+
+    push() returns a list of (event, audio) pairs:
+        ("speech", samples) - audio belonging to the current utterance
+        ("end", None)       - the utterance is complete
+        ("cancel", None)    - the utterance was too short, discard its audio
+
+    utterance_start is the stream position (in samples) where the audio of
+    the current or last utterance begins.
+    """
+
+    def __init__(self, vad=None, sample_rate=16000, frame_ms=30, start_ms=90, hangover_ms=300,
+                 pre_roll_ms=150, min_speech_ms=250):
+        self.vad = vad or create_vad(sample_rate=sample_rate)
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self._pre_roll = deque(maxlen=pre_roll_ms // frame_ms + self.start_frames)
+        self._remainder = np.empty(0, dtype=np.float32)
+        self.triggered = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._speech_frames = 0
+        self.position = 0  # samples classified so far
+        self.utterance_start = 0
+        # Counters for metrics
+        self.vad_frames = 0
+        self.vad_speech_frames = 0
+        self.utterances = 0
+        self.cancelled_utterances = 0
+
+    def push(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if len(self._remainder):
+            samples = np.concatenate([self._remainder, samples])
+        n_frames = len(samples) // self.frame_len
+        self._remainder = samples[n_frames * self.frame_len:].copy()
+        if n_frames == 0:
+            return []
+
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        decisions = self.vad.classify(frames)
+        self.vad_frames += n_frames
+        self.vad_speech_frames += int(decisions.sum())
+
+        events = []
+        # First frame of the utterance audio not yet emitted in this push
+        start = 0 if self.triggered else None
+        for i, speech in enumerate(decisions):
+            if not self.triggered:
+                # Copied: the caller may reuse the buffer behind samples
+                self._pre_roll.append(frames[i].copy())
+                self._speech_run = self._speech_run + 1 if speech else 0
+                if self._speech_run >= self.start_frames:
+                    self.utterance_start = self.position + (i + 1 - len(self._pre_roll)) * self.frame_len
+                    self.triggered = True
+                    self._silence_run = 0
+                    self._speech_frames = self._speech_run
+                    events.append(("speech", np.concatenate(self._pre_roll)))
+                    self._pre_roll.clear()
+                    start = i + 1
+                continue
+
+            if speech:
+                self._silence_run = 0
+                self._speech_frames += 1
+                continue
+
+            self._silence_run += 1
+            if self._silence_run >= self.hangover_frames:
+                events.append(("speech", frames[start:i + 1].reshape(-1)))
+                events.append(self._close())
+                self.triggered = False
+                self._speech_run = 0
+                start = None
+
+        if self.triggered and start is not None and start < n_frames:
+            events.append(("speech", frames[start:].reshape(-1)))
+        self.position += n_frames * self.frame_len
+        return [(event, audio) for event, audio in events if audio is None or len(audio)]
+
+    def _close(self):
+        if self._speech_frames >= self.min_speech_frames:
+            self.utterances += 1
+            return ("end", None)
+        self.cancelled_utterances += 1
+        return ("cancel", None)
+
+    def flush(self):
+        """End of stream: close an utterance that is still open."""
+        events = []
+        if self.triggered:
+            if len(self._remainder):
+                events.append(("speech", self._remainder))
+            events.append(self._close())
+        self.position += len(self._remainder)
+        self._remainder = np.empty(0, dtype=np.float32)
+        self.triggered = False
+        self._speech_run = 0
+        return events
+
+    def reset(self):
+        self._pre_roll.clear()
+        self._remainder = np.empty(0, dtype=np.float32)
+        self.triggered = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._speech_frames = 0
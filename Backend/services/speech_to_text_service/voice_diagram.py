@@ -0,0 +1,111 @@
+import asyncio
+import logging
+
+from bpmn_agent_client import load_bpmn_generator
+
+
+class VoiceDiagram:
+    """
+    Voice-to-diagram pipeline of one WebSocket session.
+
+    Final transcript segments accumulate into a process description. Once it
+    is stable (enough text in enough utterances) the first diagram is
+    generated from it (TYPE_1); every utterance after that becomes an edit
+    request (TYPE_2) against the latest diagram. Generation runs in a thread
+    (the LLM client is blocking), at most one at a time; utterances arriving
+    meanwhile are folded into the next edit. Updates go out through send as
+    {"type": "diagram", ...} or {"type": "diagram_error", ...} messages.
+    """
+
+    def __init__(self, send, generate=None, min_chars=200, min_segments=2):
+        """
+        Args:
+            send: Coroutine function taking a JSON-serializable message
+            generate: Callable (prompt, request_type, previous_xml) -> XML;
+                defaults to the BPMN agent's generate_bpmn_xml
+            min_chars: Description length needed before the first diagram
+            min_segments: Utterances needed before the first diagram
+        """
+        self.send = send
+        self._generate = generate
+        self._is_complete = None
+        self.min_chars = min_chars
+        self.min_segments = min_segments
+        self.description = []
+        self.pending = []
+        self.bpmn_xml = None
+        self.revision = 0
+        self.generating = False
+        self.closed = False
+
+    @property
+    def stable(self):
+        """Whether the description is long enough to generate the first diagram from."""
+        segments = self.description + self.pending
+        return len(segments) >= self.min_segments and sum(len(s) for s in segments) >= self.min_chars
+
+    def add_segment(self, text):
+        """Record a final transcript segment and start generation if the description is ready."""
+        self.pending.append(text)
+        if self.bpmn_xml is not None or self.stable:
+            self._schedule()
+
+    def set_diagram(self, bpmn_xml):
+        """Start from an existing diagram: every utterance becomes an edit of it."""
+        self.bpmn_xml = bpmn_xml
+        self.description = []
+
+    def flush(self):
+        """Generate from whatever was said so far without waiting for the stability point."""
+        if self.pending:
+            self._schedule()
+
+    def close(self):
+        self.closed = True
+
+    def _schedule(self):
+        if not self.generating:
+            self.generating = True
+            asyncio.get_running_loop().create_task(self._update())
+
+    def _request(self, segments):
+        if self.bpmn_xml is None:
+            return " ".join(self.description + segments), "TYPE_1"
+        return " ".join(segments), "TYPE_2"
+
+    async def _update(self):
+        try:
+            while self.pending and not self.closed:
+                segments, self.pending = self.pending, []
+                prompt, request_type = self._request(segments)
+                try:
+                    if self._generate is None:
+                        self._generate, self._is_complete = load_bpmn_generator()
+                    bpmn_xml = await asyncio.to_thread(self._generate, prompt, request_type, self.bpmn_xml)
+                except Exception as e:
+                    logging.error(f"Diagram generation ({request_type}) failed: {e}")
+                    # Put the segments back; the next utterance retries them
+                    self.pending[:0] = segments
+                    await self._notify({"type": "diagram_error", "request_type": request_type, "error": str(e)})
+                    return
+                if self._is_complete is not None and not self._is_complete(bpmn_xml):
+                    self.pending[:0] = segments
+                    await self._notify({"type": "diagram_error", "request_type": request_type,
+                                        "error": "Не удалось сгенерировать валидный BPMN XML."})
+                    return
+                if request_type == "TYPE_1":
+                    self.description.extend(segments)
+                self.bpmn_xml = bpmn_xml
+                self.revision += 1
+                await self._notify({"type": "diagram", "revision": self.revision, "request_type": request_type,
+                                    "prompt": prompt, "bpmn_xml": bpmn_xml})
+        finally:
+            self.generating = False
+
+    async def _notify(self, message):
+        if self.closed:
+            return
+        try:
+            await self.send(message)
+        except Exception as e:
+            logging.error(f"Failed to send diagram update: {e}")
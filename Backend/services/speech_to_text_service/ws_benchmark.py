@@ -0,0 +1,170 @@
+"""
+Load test for the speech WebSocket server.
+
+Opens N concurrent sessions that stream WAV files as int16 PCM frames at
+real-time pace (or faster), and measures the time from the end of each
+utterance (found with the server's own VAD) to its transcript arriving.
+Reports throughput, p50/p99 latency and dropped segments, plus the
+server's own worker statistics. Transcripts are matched to utterances in
+order, so use recordings without monologues longer than 30 s (those come
+back as several messages).
+
+Run the server with ASR_BACKEND=stub to measure transport and scheduling
+overhead without a model (ASR_STUB_RTF simulates inference cost).
+
+Usage:
+    ASR_BACKEND=stub python server.py
+    python ws_benchmark.py meeting.wav --sessions 16 --speed 1
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import wave
+
+import aiohttp
+import numpy as np
+
+from vad import SpeechSegmenter
+
+# Silence appended to every stream so the last utterance is closed by the VAD
+TAIL_SILENCE_SECONDS = 1.5
+
+
+def load_wav(path):
+    """Read a 16-bit PCM WAV file as mono int16 samples."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+        rate, channels = f.getframerate(), f.getnchannels()
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    silence = np.zeros(int(TAIL_SILENCE_SECONDS * rate), dtype=np.int16)
+    return rate, np.concatenate([samples, silence])
+
+
+def speech_ends(samples, rate):
+    """Sample positions where the VAD considers an utterance finished."""
+    segmenter = SpeechSegmenter(sample_rate=rate)
+    hangover = segmenter.hangover_frames * segmenter.frame_len
+    audio = samples.astype(np.float32) / 32768.0
+    ends = []
+    for offset in range(0, len(audio), segmenter.frame_len):
+        for event, _ in segmenter.push(audio[offset:offset + segmenter.frame_len]):
+            if event == "end":
+                ends.append(segmenter.position - hangover)
+    return ends
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def run_session(url, rate, samples, ends, frame_ms, speed, drain_seconds):
+    """Stream one file through one WebSocket session and time the transcripts."""
+    frame = rate * frame_ms // 1000
+    end_sent_at = []
+    received_at = []
+
+    async with aiohttp.ClientSession() as http:
+        async with http.ws_connect(f"{url}?sample_rate={rate}") as ws:
+            async def reader():
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        received_at.append(time.perf_counter())
+
+            reading = asyncio.create_task(reader())
+            started = time.perf_counter()
+            next_end = 0
+            for offset in range(0, len(samples), frame):
+                if speed > 0:
+                    await asyncio.sleep(max(0.0, started + offset / rate / speed - time.perf_counter()))
+                await ws.send_bytes(samples[offset:offset + frame].tobytes())
+                while next_end < len(ends) and ends[next_end] <= offset + frame:
+                    end_sent_at.append(time.perf_counter())
+                    next_end += 1
+
+            deadline = time.perf_counter() + drain_seconds
+            while len(received_at) < len(ends) and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+            await ws.close()
+            reading.cancel()
+
+    # Transcripts arrive in utterance order; the k-th answers the k-th utterance
+    latencies = [(received - ended) * 1000 for ended, received in zip(end_sent_at, received_at)]
+    return {"expected": len(ends), "received": len(received_at), "latencies_ms": latencies}
+
+
+async def fetch_server_stats(url):
+    metrics_url = url.replace("ws://", "http://").replace("wss://", "https://").rsplit("/", 1)[0] + "/metrics"
+    try:
+        async with aiohttp.ClientSession() as http:
+            async with http.get(metrics_url) as response:
+                return await response.json()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def main_async(args):
+    files = [load_wav(path) for path in args.wav]
+    ends = [speech_ends(samples, rate) for rate, samples in files]
+    audio_seconds = sum(len(files[i % len(files)][1]) / files[i % len(files)][0] for i in range(args.sessions))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        run_session(args.url, files[i % len(files)][0], files[i % len(files)][1], ends[i % len(files)],
+                    args.frame_ms, args.speed, args.drain)
+        for i in range(args.sessions)
+    ], return_exceptions=True)
+    wall = time.perf_counter() - started
+
+    failed = [r for r in results if isinstance(r, Exception)]
+    results = [r for r in results if not isinstance(r, Exception)]
+    latencies = [latency for r in results for latency in r["latencies_ms"]]
+    expected = sum(r["expected"] for r in results)
+    received = sum(r["received"] for r in results)
+    server = await fetch_server_stats(args.url)
+
+    report = {
+        "sessions": args.sessions,
+        "failed_sessions": len(failed),
+        "speed": args.speed,
+        "audio_seconds": round(audio_seconds, 1),
+        "wall_seconds": round(wall, 1),
+        "throughput_x_realtime": round(audio_seconds / wall, 2),
+        "transcripts_per_second": round(received / wall, 2),
+        "utterances": expected,
+        "transcripts": received,
+        "dropped_segments": max(0, expected - received),
+        "p50_latency_ms": round(percentile(latencies, 50), 1) if latencies else None,
+        "p99_latency_ms": round(percentile(latencies, 99), 1) if latencies else None,
+        "server": server.get("asr", server),
+    }
+    for error in failed:
+        print(f"session failed: {error}")
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("wav", nargs="+", help="16-bit PCM WAV files, assigned to sessions round-robin")
+    parser.add_argument("--url", default="ws://localhost:8080/ws", help="WebSocket endpoint")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed; 1 is real time, 0 as fast as possible")
+    parser.add_argument("--frame-ms", type=int, default=100, help="Audio per WebSocket frame")
+    parser.add_argument("--drain", type=float, default=30.0, help="Seconds to wait for outstanding transcripts")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()